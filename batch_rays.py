@@ -0,0 +1,104 @@
+import numpy as np
+from maze_grid import as_maze_grid
+
+SIDE_NONE = -1
+SIDE_X = 0  # the ray crossed a vertical grid line last (hit the left/right face of a cell)
+SIDE_Y = 1  # the ray crossed a horizontal grid line last (hit the top/bottom face of a cell)
+
+
+def grid_to_array(grid):
+	"""
+	Returns the maze grid as a 2D uint8 NumPy array (1 = free, 0 = wall), without copying a MazeGrid.
+	"""
+	if isinstance(grid, np.ndarray):
+		return grid.astype(np.uint8, copy=False)
+	return as_maze_grid(grid).array
+
+
+def grid_window(grid, start_row, reach):
+	"""
+	Returns (cells, top): the rows of grid within reach rows of start_row as a uint8 array, and the
+	index of its first row. In-memory grids are returned whole without copying; grids that only
+	offer window() (endless or memory-mapped mazes) have just the needed rows unpacked.
+	"""
+	if isinstance(grid, np.ndarray) or not hasattr(grid, "window"):
+		return grid_to_array(grid), 0
+	top = max(start_row - reach, 0)
+	bottom = min(start_row + reach + 1, grid.height)
+	return grid.window(top, bottom - top), top
+
+
+def cast_rays(start_x, start_y, angles, grid, cell_size, max_distance):
+	"""
+	Casts one ray per entry of angles from (start_x, start_y) at the same time, using the same DDA
+	traversal as rays.cast_ray but with every ray's state held in NumPy arrays. All rays still
+	travelling are stepped together until each one has hit a wall, left the grid or reached max_distance.
+	- start_x, start_y: Starting position in pixels.
+	- angles: 1D array of ray angles in radians.
+	- grid: The maze grid (True/1 = free, False/0 = wall).
+	- cell_size: Size of each cell.
+	- max_distance: Maximum distance a ray can travel.
+	Returns a tuple (distances, sides, hit_rows, hit_cols):
+		- distances: float array, distance to the hit point (max_distance if nothing was hit).
+		- sides: int8 array, SIDE_X / SIDE_Y for the face that was hit, SIDE_NONE if nothing was hit.
+		- hit_rows, hit_cols: int arrays with the cell where each ray stopped.
+	"""
+	angles = np.asarray(angles, dtype=np.float64)
+	count = angles.shape[0]
+
+	dir_x = np.cos(angles)
+	dir_y = np.sin(angles)
+
+	start_col = int(start_x // cell_size)
+	start_row = int(start_y // cell_size)
+	cells, top = grid_window(grid, start_row, int(max_distance // cell_size) + 2)
+	rows, cols = cells.shape
+	cell_x = np.full(count, start_col, dtype=np.int64)
+	cell_y = np.full(count, start_row, dtype=np.int64)
+
+	# Step direction and the first grid line crossed along each axis
+	step_x = np.where(dir_x > 0, 1, -1)
+	step_y = np.where(dir_y > 0, 1, -1)
+	next_boundary_x = np.where(dir_x > 0, (start_col + 1) * cell_size, start_col * cell_size)
+	next_boundary_y = np.where(dir_y > 0, (start_row + 1) * cell_size, start_row * cell_size)
+
+	with np.errstate(divide='ignore', invalid='ignore'):
+		t_max_x = np.where(dir_x != 0, (next_boundary_x - start_x) / dir_x, np.inf)
+		t_max_y = np.where(dir_y != 0, (next_boundary_y - start_y) / dir_y, np.inf)
+		t_delta_x = np.where(dir_x != 0, cell_size / np.abs(dir_x), np.inf)
+		t_delta_y = np.where(dir_y != 0, cell_size / np.abs(dir_y), np.inf)
+
+	t = np.zeros(count)
+	sides = np.full(count, SIDE_NONE, dtype=np.int8)
+	hit = np.zeros(count, dtype=bool)
+	active = np.flatnonzero(np.ones(count, dtype=bool)) if max_distance > 0 else np.empty(0, dtype=np.int64)
+
+	while active.size:
+		# Step every active ray across its nearest grid line
+		use_x = t_max_x[active] < t_max_y[active]
+		ix = active[use_x]
+		iy = active[~use_x]
+		t[ix] = t_max_x[ix]
+		cell_x[ix] += step_x[ix]
+		t_max_x[ix] += t_delta_x[ix]
+		sides[ix] = SIDE_X
+		t[iy] = t_max_y[iy]
+		cell_y[iy] += step_y[iy]
+		t_max_y[iy] += t_delta_y[iy]
+		sides[iy] = SIDE_Y
+
+		# Retire rays that ran out of distance, left the grid or entered a wall.
+		# Leaving the grid counts as a hit, like the outer boundary of rays.cast_ray.
+		cx = cell_x[active]
+		cy = cell_y[active]
+		in_range = t[active] < max_distance
+		inside = (cx >= 0) & (cx < cols) & (cy >= top) & (cy < top + rows)
+		wall = np.zeros(active.size, dtype=bool)
+		check = in_range & inside
+		wall[check] = cells[cy[check] - top, cx[check]] == 0
+		hit[active[wall | (in_range & ~inside)]] = True
+		active = active[in_range & inside & ~wall]
+
+	distances = np.minimum(t, max_distance)
+	sides[~hit] = SIDE_NONE
+	return distances, sides, cell_y, cell_x
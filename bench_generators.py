@@ -0,0 +1,47 @@
+"""
+Benchmarks the maze generators of maze_generators against maze_functions.generate_maze.
+
+Usage: python bench_generators.py [--sizes 101 501 1001 2001] [--repeat 3] [--round-walk 15] [--legacy-limit 1001]
+"""
+import argparse
+import random
+import time
+from maze_functions import generate_maze
+from maze_generators import ALGORITHMS, generate
+
+
+def best_time(function, repeat):
+	best = float('inf')
+	for _ in range(repeat):
+		start = time.perf_counter()
+		function()
+		best = min(best, time.perf_counter() - start)
+	return best
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark maze generators.")
+	parser.add_argument("--sizes", type=int, nargs="+", default=[101, 501, 1001, 2001])
+	parser.add_argument("--repeat", type=int, default=3)
+	parser.add_argument("--round-walk", type=int, default=15)
+	parser.add_argument("--legacy-limit", type=int, default=1001,
+		help="largest size to run the legacy generate_maze on (it gets very slow)")
+	args = parser.parse_args()
+
+	names = ["legacy"] + list(ALGORITHMS)
+	print("{:>6} ".format("size") + " ".join("{:>12}".format(name) for name in names))
+	for size in args.sizes:
+		timings = []
+		if size <= args.legacy_limit:
+			random.seed(size)
+			timings.append(best_time(lambda: generate_maze(size, size, args.round_walk), args.repeat))
+		else:
+			timings.append(None)
+		for name in ALGORITHMS:
+			timings.append(best_time(lambda: generate(size, size, args.round_walk, name, seed=size), args.repeat))
+		print("{:>6} ".format(size) + " ".join(
+			"{:>11.3f}s".format(t) if t is not None else "{:>12}".format("-") for t in timings))
+
+
+if __name__ == '__main__':
+	main()
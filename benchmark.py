@@ -0,0 +1,219 @@
+"""
+Headless frame-time benchmark of the renderer.
+
+Flies a scripted camera along the best path of seeded mazes for every combination of grid size,
+view distance, resolution, floor mode, wall mode and view (3D ray caster or 2D visibility polygon), without
+opening a window (SDL dummy video driver), and prints per-stage timings as JSON percentiles:
+floor, walls and present (draw_view), visibility (the 2D visibility overlay), hud, flip and the whole frame.
+Maze generation (maze_generators.generate, optionally the legacy generate_maze) and solving are timed per size.
+
+Usage: python benchmark.py [--sizes 13 31 61] [--view-distances 5 10] [--resolutions 600 1000]
+	[--floor-modes pixels segments] [--wall-modes flat textured] [--views 3d 2d] [--frames 120] [--seed 1] [--legacy]
+	[--parallel] [--render-scale 0.5] [--output results.json] [--budget-ms 16.7]
+
+With --budget-ms the exit status is 1 when the 90th percentile frame time of any run is over budget,
+so a build can refuse to package a slower renderer.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+# Keep stdout clean for the JSON report.
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import itertools
+import json
+import math
+import platform
+import random
+import sys
+import time
+import pygame
+import main as game
+from instrumentation import StageTimer
+from maze_functions import generate_maze
+from maze_generators import generate
+from maze_solver import distance_field
+from player import Player
+from parallel_render import ParallelRenderer
+from ray_caster import draw_view, FLOOR_PIXELS, FLOOR_SEGMENTS, WALLS_FLAT, WALLS_TEXTURED
+from render_scale import draw_scaled_view
+from route_tracker import RouteTracker
+from visibility import VisibilityOverlay
+
+ROUND_WALK = 15
+VIEWS = ("3d", "2d")
+# Camera speed along the scripted path, in cells per frame.
+CAMERA_SPEED = 0.15
+
+
+def first_free_cell(grid):
+	for row in range(grid.height):
+		for col in range(grid.width):
+			if grid.is_free(row, col):
+				return row, col
+	return None
+
+
+def best_route(grid):
+	"""
+	The route the scripted camera flies: the best path from the first free cell to the furthest one.
+	Returns (cells, tracker) with cells the path as (row, col) and tracker a RouteTracker for it, which
+	main.draw_hud reads as main.route_tracker.
+	"""
+	from_start = distance_field(grid, *first_free_cell(grid))
+	to_goal = distance_field(grid, *from_start.furthest)
+	return from_start.path_to(*from_start.furthest), RouteTracker(from_start, to_goal)
+
+
+def camera_path(cells, frames):
+	"""
+	Scripted camera along cells (see best_route): walks them at CAMERA_SPEED cells per frame, looking
+	ahead along the path with a slow side-to-side sway, and turns around at the end.
+	Returns a list of (x, y, orientation) in cell units, one per frame.
+	"""
+	if len(cells) < 2:
+		cells = cells * 2
+	cells = cells + cells[-2::-1]
+	poses = []
+	for frame in range(frames):
+		position = (frame * CAMERA_SPEED) % (len(cells) - 1)
+		index = int(position)
+		fraction = position - index
+		(row_a, col_a), (row_b, col_b) = cells[index], cells[index + 1]
+		x = col_a + (col_b - col_a) * fraction + 0.5
+		y = row_a + (row_b - row_a) * fraction + 0.5
+		orientation = math.atan2(row_b - row_a, col_b - col_a) + 0.4 * math.sin(frame / 15)
+		poses.append((x, y, orientation))
+	return poses
+
+
+def time_maze(size, seed, algorithm, legacy):
+	"""
+	Generates and solves the maze for size; returns (grid, timings in ms).
+	"""
+	timings = {}
+	start = time.perf_counter()
+	grid = generate(size, size, ROUND_WALK, algorithm, seed=seed)
+	timings["generate_ms"] = (time.perf_counter() - start) * 1000
+	start = time.perf_counter()
+	distance_field(grid, *first_free_cell(grid))
+	timings["solve_ms"] = (time.perf_counter() - start) * 1000
+	if legacy:
+		random.seed(seed)
+		start = time.perf_counter()
+		generate_maze(size, size, ROUND_WALK)
+		timings["generate_legacy_ms"] = (time.perf_counter() - start) * 1000
+	return grid, timings
+
+
+def run(grid, size, view_distance, resolution, floor_mode, view, frames, warmup, font, render_view=draw_view, render_scale=1.0,
+		wall_mode=WALLS_FLAT):
+	"""
+	Renders frames + warmup frames of the scripted camera path and returns the stage summary
+	of the timed frames.
+	- render_view: draw_view or ParallelRenderer.draw_view.
+	- render_scale: Internal resolution of the 3D view (see render_scale.draw_scaled_view).
+	"""
+	screen = pygame.display.set_mode((resolution, resolution))
+	cell_size = resolution // size
+	max_distance = view_distance * cell_size
+	player = Player(pygame.math.Vector2(), cell_size * 0.3, 0)
+	path = {}
+	overlay = VisibilityOverlay()
+	timer = StageTimer()
+	cells, game.route_tracker = best_route(grid)
+	best_path = {cell: game.best_path_color for cell in cells}
+	for frame, (x, y, orientation) in enumerate(camera_path(cells, frames + warmup)):
+		if frame == warmup:
+			timer.clear()
+		player.pos.update(x * cell_size, y * cell_size)
+		player.orientation = orientation
+		player.normalize_orientation()
+		cell = (int(y), int(x))
+		path[cell] = (255, 0, 0)
+		game.route_tracker.enter(cell)
+		with timer.stage("frame"):
+			if view == "3d":
+				draw_scaled_view(render_view, render_scale, player, grid, cell_size, max_distance, screen, resolution, resolution, path,
+					cell_size / 6, floor_mode=floor_mode, timer=timer, wall_mode=wall_mode)
+			else:
+				screen.fill((255, 255, 255))
+				with timer.stage("visibility"):
+					timer.count("visibility_rays", overlay.draw(player, grid, cell_size, max_distance, screen))
+			with timer.stage("hud"):
+				game.draw_hud(screen, font, frame / 60, best_path, path)
+			with timer.stage("flip"):
+				pygame.display.flip()
+	return timer.summary()
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Headless renderer benchmark.")
+	parser.add_argument("--sizes", type=int, nargs="+", default=[13, 31, 61])
+	parser.add_argument("--view-distances", type=float, nargs="+", default=[5, 10])
+	parser.add_argument("--resolutions", type=int, nargs="+", default=[600, 1000])
+	parser.add_argument("--floor-modes", nargs="+", default=[FLOOR_PIXELS, FLOOR_SEGMENTS],
+		choices=[FLOOR_PIXELS, FLOOR_SEGMENTS])
+	parser.add_argument("--wall-modes", nargs="+", default=[WALLS_FLAT, WALLS_TEXTURED], choices=[WALLS_FLAT, WALLS_TEXTURED])
+	parser.add_argument("--views", nargs="+", default=list(VIEWS), choices=VIEWS)
+	parser.add_argument("--frames", type=int, default=120)
+	parser.add_argument("--warmup", type=int, default=5)
+	parser.add_argument("--seed", type=int, default=1)
+	parser.add_argument("--algorithm", default="backtracker")
+	parser.add_argument("--legacy", action="store_true", help="also time the legacy generate_maze")
+	parser.add_argument("--parallel", action="store_true", help="render the 3D view with parallel_render")
+	parser.add_argument("--render-scale", type=float, default=1.0, help="internal resolution of the 3D view, e.g. 0.5")
+	parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+	parser.add_argument("--budget-ms", type=float, help="fail if any run's p90 frame time exceeds this")
+	args = parser.parse_args()
+
+	pygame.display.init()
+	pygame.font.init()
+	font = pygame.font.SysFont(None, 30)
+	renderer = ParallelRenderer() if args.parallel else None
+	report = {
+		"python": platform.python_version(),
+		"pygame": pygame.version.ver,
+		"frames": args.frames,
+		"seed": args.seed,
+		"render_scale": args.render_scale,
+		"render_workers": renderer.workers if renderer is not None else 1,
+		"mazes": [],
+		"runs": [],
+	}
+	for size in args.sizes:
+		grid, timings = time_maze(size, args.seed, args.algorithm, args.legacy)
+		report["mazes"].append(dict(size=size, algorithm=args.algorithm, **timings))
+		for view_distance in args.view_distances:
+			for resolution in args.resolutions:
+				for view in args.views:
+					# The floor and wall modes only matter for the 3D view.
+					for floor_mode, wall_mode in itertools.product(*((args.floor_modes, args.wall_modes) if view == "3d" else ([None], [None]))):
+						stages = run(grid, size, view_distance, resolution, floor_mode, view, args.frames, args.warmup, font,
+							renderer.draw_view if renderer is not None else draw_view, args.render_scale, wall_mode)
+						report["runs"].append({"size": size, "view_distance": view_distance, "resolution": resolution,
+							"view": view, "floor_mode": floor_mode, "wall_mode": wall_mode, "stages": stages})
+	if renderer is not None:
+		renderer.close()
+	pygame.quit()
+
+	text = json.dumps(report, indent=2)
+	if args.output:
+		with open(args.output, "w") as file:
+			file.write(text + "\n")
+	else:
+		print(text)
+
+	if args.budget_ms is not None:
+		slow = [result for result in report["runs"] if result["stages"]["frame"]["p90_ms"] > args.budget_ms]
+		for result in slow:
+			sys.stderr.write("Over budget: size {size} view distance {view_distance} resolution {resolution} "
+				"{view} {floor_mode} {wall_mode}: p90 {p90:.2f} ms\n".format(p90=result["stages"]["frame"]["p90_ms"], **result))
+		if slow:
+			sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -11,6 +11,22 @@ echo "Cleaning previous build artifacts..."
 rm -rf build dist ${DIST_DIR} *.spec
 mkdir -p ${BUILD_DIR} ${DIST_DIR}
 
+###############################################################################
+# Step 0: Optional frame-time check (set FRAME_BUDGET_MS to enable)
+###############################################################################
+if [ -n "${FRAME_BUDGET_MS}" ]; then
+    echo "Checking renderer frame times against ${FRAME_BUDGET_MS} ms..."
+    python benchmark.py --frames 60 --output ${BUILD_DIR}/benchmark.json --budget-ms ${FRAME_BUDGET_MS}
+fi
+
+###############################################################################
+# Step 0b: Optional replay of recorded games (set REPLAY_DIR to a folder of .replay files)
+###############################################################################
+if [ -n "${REPLAY_DIR}" ]; then
+    echo "Replaying recorded games from ${REPLAY_DIR}..."
+    python replay.py ${REPLAY_DIR}/*.replay --render --output ${BUILD_DIR}/replays.json ${FRAME_BUDGET_MS:+--budget-ms ${FRAME_BUDGET_MS}}
+fi
+
 ###############################################################################
 # Step 1: Build the Linux Executable with PyInstaller
 ###############################################################################
@@ -0,0 +1,145 @@
+import math
+import numpy as np
+from maze_grid import as_maze_grid
+
+# Bits of the per-cell neighbour mask: one per wall among the 8 cells around a free cell.
+UP_LEFT, UP, UP_RIGHT, LEFT, RIGHT, DOWN_LEFT, DOWN, DOWN_RIGHT = (1 << bit for bit in range(8))
+_NEIGHBOURS = ((UP_LEFT, -1, -1), (UP, -1, 0), (UP_RIGHT, -1, 1), (LEFT, 0, -1),
+	(RIGHT, 0, 1), (DOWN_LEFT, 1, -1), (DOWN, 1, 0), (DOWN_RIGHT, 1, 1))
+# Push-out passes per substep before a step is rejected.
+RESOLVE_PASSES = 3
+# Extra clearance (pixels) left by push-out so rounding never leaves the circle touching the wall.
+CLEARANCE = 1e-6
+
+
+class CollisionMap:
+	def __init__(self, grid, cell_size, radius):
+		"""
+		Precomputed wall layout for circle-vs-maze collision.
+		Every cell gets one byte whose bits say which of its 8 neighbours are walls (cells outside the
+		maze count as walls). As long as the circle is smaller than a cell it can only touch those 8
+		cells, so a query reads a single byte and tests at most 4 edges and 4 corners, without
+		building Rects or Vector2s.
+		- grid: The maze (list-of-lists or MazeGrid).
+		- cell_size: Size of each grid cell in pixels.
+		- radius: Radius of the circle to collide; must be smaller than cell_size.
+		"""
+		if radius >= cell_size:
+			raise ValueError("radius must be smaller than cell_size")
+		grid = as_maze_grid(grid)
+		self.width = grid.width
+		self.height = grid.height
+		self.cell_size = cell_size
+		self.radius = radius
+		free = np.asarray(grid.array if hasattr(grid, "array") else grid.window(0, grid.height), dtype=bool)
+		padded = np.pad(free, 1)
+		walls = np.zeros(free.shape, dtype=np.uint8)
+		for bit, d_row, d_col in _NEIGHBOURS:
+			neighbour = padded[1 + d_row:1 + d_row + self.height, 1 + d_col:1 + d_col + self.width]
+			walls |= np.where(neighbour, 0, bit).astype(np.uint8)
+		self.free = free.astype(np.uint8).tobytes()
+		self.walls = walls.tobytes()
+
+	def collides(self, x, y):
+		"""
+		Checks if the circle centred on (x, y) overlaps a wall. Same result as player.circle_collides.
+		"""
+		cell_size = self.cell_size
+		col = int(x // cell_size)
+		row = int(y // cell_size)
+		if not (0 <= row < self.height and 0 <= col < self.width):
+			return True
+		index = row * self.width + col
+		if not self.free[index]:
+			return True
+		walls = self.walls[index]
+		if not walls:
+			return False
+		radius = self.radius
+		fx = x - col * cell_size
+		fy = y - row * cell_size
+		near_left = fx < radius
+		near_right = cell_size - fx < radius
+		near_top = fy < radius
+		near_bottom = cell_size - fy < radius
+		if (walls & LEFT and near_left) or (walls & RIGHT and near_right) \
+				or (walls & UP and near_top) or (walls & DOWN and near_bottom):
+			return True
+		radius_sq = radius * radius
+		gx = cell_size - fx
+		gy = cell_size - fy
+		if walls & UP_LEFT and near_left and near_top and fx * fx + fy * fy < radius_sq:
+			return True
+		if walls & UP_RIGHT and near_right and near_top and gx * gx + fy * fy < radius_sq:
+			return True
+		if walls & DOWN_LEFT and near_left and near_bottom and fx * fx + gy * gy < radius_sq:
+			return True
+		if walls & DOWN_RIGHT and near_right and near_bottom and gx * gx + gy * gy < radius_sq:
+			return True
+		return False
+
+	def _push_out(self, x, y):
+		# Moves (x, y) out of the walls around its cell; returns the corrected position.
+		cell_size = self.cell_size
+		col = int(x // cell_size)
+		row = int(y // cell_size)
+		if not (0 <= row < self.height and 0 <= col < self.width):
+			return x, y
+		index = row * self.width + col
+		if not self.free[index]:
+			return x, y
+		walls = self.walls[index]
+		radius = self.radius + CLEARANCE
+		left = col * cell_size
+		top = row * cell_size
+		right = left + cell_size
+		bottom = top + cell_size
+		if walls & LEFT and x - left < radius:
+			x = left + radius
+		if walls & RIGHT and right - x < radius:
+			x = right - radius
+		if walls & UP and y - top < radius:
+			y = top + radius
+		if walls & DOWN and bottom - y < radius:
+			y = bottom - radius
+		for bit, corner_x, corner_y in ((UP_LEFT, left, top), (UP_RIGHT, right, top),
+				(DOWN_LEFT, left, bottom), (DOWN_RIGHT, right, bottom)):
+			if walls & bit:
+				dx = x - corner_x
+				dy = y - corner_y
+				distance_sq = dx * dx + dy * dy
+				if 0 < distance_sq < radius * radius:
+					scale = radius / math.sqrt(distance_sq)
+					x = corner_x + dx * scale
+					y = corner_y + dy * scale
+		return x, y
+
+	def slide(self, x, y, dx, dy):
+		"""
+		Moves a circle from (x, y) by (dx, dy), sliding along the walls it runs into.
+		The move is split into substeps no longer than half the radius, so the circle cannot tunnel
+		through a wall however large the step; each substep is pushed back out of the walls it
+		overlaps, which cancels the motion into the wall and keeps the motion along it.
+		Returns the new (x, y).
+		"""
+		length = math.hypot(dx, dy)
+		if length == 0:
+			return x, y
+		steps = max(1, int(math.ceil(length / (self.radius * 0.5))))
+		step_x = dx / steps
+		step_y = dy / steps
+		for _ in range(steps):
+			new_x = x + step_x
+			new_y = y + step_y
+			for _ in range(RESOLVE_PASSES):
+				if not self.collides(new_x, new_y):
+					break
+				new_x, new_y = self._push_out(new_x, new_y)
+			else:
+				if self.collides(new_x, new_y):
+					# Wedged (e.g. into a corner at an odd angle): stay at the last valid position.
+					break
+			if new_x == x and new_y == y:
+				break
+			x, y = new_x, new_y
+		return x, y
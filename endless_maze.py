@@ -0,0 +1,175 @@
+"""
+Streaming maze generation for endless mazes.
+
+Eller's algorithm only needs the set labels of the current row, so a maze of fixed width can be
+generated one row at a time forever. The grid rows of the stream are laid out in pairs:
+	- row 2r: the wall row above cell row r (the top border for r = 0),
+	- row 2r + 1: cell row r.
+The left and right border columns are always walls.
+
+ChunkedMazeGrid cuts the stream into chunks of chunk_pairs pairs. Every chunk is generated from a
+small checkpoint (the Eller state at its first row) with its own seeded random generator, so evicted
+chunks can be regenerated exactly. Only a few checkpoints are kept: those of the recently generated
+chunks and a sparse set that thins out with the distance to the deepest chunk reached and to the
+chunk asked for last (see ChunkedMazeGrid._is_sparse), about two per power of two. A chunk without a checkpoint is regenerated
+forward from the nearest kept one before it, so memory stays bounded by the chunks kept around
+(plus a logarithmic number of checkpoints) however deep the player goes.
+"""
+from collections import OrderedDict
+import numpy as np
+from maze_generators import eller_row
+
+ENDLESS_HEIGHT = 2 ** 31 - 1
+# Sparse checkpoints: the last CHECKPOINTS_PER_LEVEL multiples of every power of two up to the deepest
+# chunk, and up to the chunk asked for last.
+CHECKPOINTS_PER_LEVEL = 4
+
+
+def _normalize(labels):
+	# Relabels sets as 0..n-1 so checkpoints stay small and independent of history.
+	_, labels = np.unique(labels, return_inverse=True)
+	return labels.astype(np.int64), int(labels.max()) + 1 if labels.size else 0
+
+
+def _chunk_rng(seed, chunk):
+	return np.random.default_rng([seed, chunk])
+
+
+def generate_pairs(width, labels, vertical_in, next_label, rng, pairs):
+	"""
+	Generates pairs of grid rows with Eller's algorithm.
+	- width: Grid width in cells (odd); the maze has (width - 1) // 2 cell columns.
+	- labels: Set labels of the first cell row.
+	- vertical_in: bool array, openings from the previous cell row into the first cell row.
+	- next_label: First unused set label.
+	- rng: numpy.random.Generator.
+	- pairs: Number of (wall row, cell row) pairs to generate.
+	Returns (rows, labels, vertical_in, next_label): a (2 * pairs, width) uint8 array and the state
+	after the last generated pair.
+	"""
+	cols = labels.shape[0]
+	rows = np.zeros((2 * pairs, width), dtype=np.uint8)
+	for pair in range(pairs):
+		horizontal, vertical, next_labels, next_label = eller_row(labels, rng, next_label)
+		rows[2 * pair, 1:2 * cols:2] = vertical_in
+		rows[2 * pair + 1, 1:2 * cols:2] = 1
+		rows[2 * pair + 1, 2:2 * cols - 1:2] = horizontal
+		labels, vertical_in = next_labels, vertical
+	return rows, labels, vertical_in, next_label
+
+
+def stream_rows(width, seed=None, pairs_per_step=1):
+	"""
+	Yields the grid rows of an endless maze lazily, pairs_per_step pairs (2 * pairs_per_step rows) at a time.
+	"""
+	cols = max((width - 1) // 2, 1)
+	labels = np.arange(cols)
+	vertical_in = np.zeros(cols, dtype=bool)
+	next_label = cols
+	rng = np.random.default_rng(seed)
+	while True:
+		rows, labels, vertical_in, next_label = generate_pairs(width, labels, vertical_in, next_label, rng, pairs_per_step)
+		yield rows
+
+
+class ChunkedMazeGrid:
+	def __init__(self, width, seed=0, chunk_pairs=16, max_chunks=8):
+		"""
+		An endless (downwards) maze that generates its rows in chunks when they are first needed.
+		It implements the MazeGrid interface (width, height, is_free, in_bounds, grid[row][col]).
+		- width: Grid width in cells (odd).
+		- seed: Seed of the maze; the same seed always gives the same maze.
+		- chunk_pairs: Number of (wall row, cell row) pairs per chunk; a chunk has 2 * chunk_pairs rows.
+		- max_chunks: Number of generated chunks kept in memory; the least recently used are dropped.
+		"""
+		self.width = width
+		self.height = ENDLESS_HEIGHT
+		self.seed = seed
+		self.chunk_rows = 2 * chunk_pairs
+		self.max_chunks = max_chunks
+		self._chunk_pairs = chunk_pairs
+		self._chunks = OrderedDict()
+		cols = max((width - 1) // 2, 1)
+		# checkpoints[k] holds the Eller state at the first row of chunk k; recent orders the
+		# checkpoints that are kept because they were made lately.
+		self._checkpoints = {0: (np.arange(cols), np.zeros(cols, dtype=bool), cols)}
+		self._recent = OrderedDict()
+		self._deepest = 0
+		self._focus = 0
+
+	def chunk(self, index):
+		"""
+		Returns the (chunk_rows, width) uint8 array of chunk index, generating it if needed.
+		"""
+		rows = self._chunks.get(index)
+		if rows is not None:
+			self._chunks.move_to_end(index)
+			return rows
+		# Run the generator forward from the nearest checkpoint; the chunks in between are not kept.
+		self._focus = index
+		start = max(k for k in self._checkpoints if k <= index)
+		state = self._checkpoints[start]
+		for k in range(start, index + 1):
+			rows, labels, vertical_in, next_label = generate_pairs(
+				self.width, *state, _chunk_rng(self.seed, k), self._chunk_pairs)
+			labels, next_label = _normalize(labels)
+			state = (labels, vertical_in, next_label)
+			self._keep_checkpoint(k + 1, state)
+		self._chunks[index] = rows
+		while len(self._chunks) > self.max_chunks:
+			self._chunks.popitem(last=False)
+		return rows
+
+	def _keep_checkpoint(self, index, state):
+		self._checkpoints.setdefault(index, state)
+		self._recent[index] = None
+		self._recent.move_to_end(index)
+		while len(self._recent) > 2 * self.max_chunks:
+			self._recent.popitem(last=False)
+		self._deepest = max(self._deepest, index)
+		for k in [k for k in self._checkpoints if k not in self._recent and not self._is_sparse(k)]:
+			del self._checkpoints[k]
+
+	def _is_sparse(self, index):
+		# Whether index is one of the CHECKPOINTS_PER_LEVEL multiples of its largest power of two
+		# divisor just before the deepest chunk or the chunk asked for last; chunk 0 always is.
+		reach = CHECKPOINTS_PER_LEVEL * (index & -index)
+		return index == 0 or any(anchor - reach < index <= anchor for anchor in (self._deepest, self._focus))
+
+	def checkpoint_count(self):
+		return len(self._checkpoints)
+
+	def prefetch(self, row, distance):
+		"""
+		Makes sure the chunks covering rows row - distance .. row + distance are loaded.
+		Call it with the player's row and the view distance (in cells) as the player moves.
+		"""
+		first = max(row - distance, 0) // self.chunk_rows
+		last = max(row + distance, 0) // self.chunk_rows
+		for index in range(first, last + 1):
+			self.chunk(index)
+
+	def loaded_chunks(self):
+		return list(self._chunks)
+
+	def is_free(self, row, col):
+		return self.chunk(row // self.chunk_rows)[row % self.chunk_rows, col] != 0
+
+	def in_bounds(self, row, col):
+		return 0 <= row < self.height and 0 <= col < self.width
+
+	def window(self, top, rows):
+		"""
+		Returns grid rows top .. top + rows - 1 as a (rows, width) uint8 array, for vectorized consumers.
+		"""
+		first = top // self.chunk_rows
+		last = (top + rows - 1) // self.chunk_rows
+		block = np.concatenate([self.chunk(index) for index in range(first, last + 1)])
+		offset = top - first * self.chunk_rows
+		return block[offset:offset + rows]
+
+	def __getitem__(self, row):
+		return self.chunk(row // self.chunk_rows)[row % self.chunk_rows]
+
+	def __len__(self):
+		return self.height
@@ -0,0 +1,119 @@
+import math
+from itertools import islice
+import numpy as np
+from path_store import PathStore
+
+
+class PathBitmap:
+	def __init__(self, rows, cols):
+		"""
+		Grid-aligned copy of a path dictionary ({(row, col): (r, g, b)}) for array lookups.
+		- mask[row, col] is True for cells in the path.
+		- colors[row, col] holds the color of that path cell.
+		"""
+		self.rows = rows
+		self.cols = cols
+		self.mask = np.zeros((rows, cols), dtype=bool)
+		self.colors = np.zeros((rows, cols, 3), dtype=np.uint8)
+		self._source = None
+		self._synced = 0
+
+	def sync(self, path):
+		"""
+		Brings the bitmap up to date with path. Paths only ever grow during a run, so only
+		entries added since the last call are copied; a different or shrunken dict triggers a rebuild.
+		"""
+		if path is not self._source or len(path) < self._synced:
+			self.mask[:] = False
+			self._source = path
+			self._synced = 0
+		if len(path) == self._synced:
+			return
+		for (row, col), color in islice(path.items(), self._synced, None):
+			if 0 <= row < self.rows and 0 <= col < self.cols:
+				self.mask[row, col] = True
+				self.colors[row, col] = color
+		self._synced = len(path)
+
+
+_shared_bitmap = None
+
+
+def get_path_bitmap(path, rows, cols):
+	"""
+	Returns the bitmap to use for path: a PathStore already is one; any other dict is copied into
+	a PathBitmap of the given size, reusing the previous one when possible.
+	"""
+	global _shared_bitmap
+	if isinstance(path, PathStore):
+		return path
+	if _shared_bitmap is None or _shared_bitmap.rows != rows or _shared_bitmap.cols != cols:
+		_shared_bitmap = PathBitmap(rows, cols)
+	_shared_bitmap.sync(path)
+	return _shared_bitmap
+
+
+def draw_floor(frame_buffer, player, cell_size, max_distance, width, height, path_bitmap=None, path_point_size=10, delta=1, rows=None):
+	"""
+	Draws the floor of the 3D view by computing the world position of every pixel below the horizon at once.
+
+	Row y lies at perpendicular distance (cell_size / 2 * height) / (2 * (y - horizon)) from the player
+	(the same similar-triangle distance used by the segment floor), and column x looks along the angle
+	left_angle + (x + 0.5) / width * fov, so the floor point is
+		player.pos + direction(angle) * perpendicular_distance / cos(angle - orientation).
+	Each pixel is then classified with array ops, in the same order as rays.cast_horizontal_ray:
+		- path color: within path_point_size of the center of a cell marked in path_bitmap.
+		- grey: within delta of a grid line.
+		- white otherwise.
+	Rows whose edge distance exceeds max_distance are left untouched, like in the segment floor.
+	- frame_buffer: The FrameBuffer to write into.
+	- path_bitmap: A PathBitmap with the path cells, or None.
+	- rows: Optional (first, stop) range of screen rows to draw; every pixel is computed independently,
+	  so disjoint row bands can be drawn by different threads (see parallel_render).
+	"""
+	horizon = height // 2
+	half_fov = (player.fov / 2) / 180 * math.pi
+	if rows is None:
+		ys = np.arange(horizon + 1, height)
+	else:
+		ys = np.arange(max(rows[0], horizon + 1), min(rows[1], height))
+		if ys.size == 0:
+			return
+	perpendicular = (cell_size / 2 * height) / (2.0 * (ys - horizon))
+	in_range = perpendicular / math.cos(half_fov) <= max_distance
+	if not in_range.any():
+		return
+	first = int(np.argmax(in_range))
+	ys = ys[first:]
+	perpendicular = perpendicular[first:].astype(np.float32)
+
+	angles = player.orientation - half_fov + (np.arange(width) + 0.5) / width * (2 * half_fov)
+	correction = np.cos(angles - player.orientation)
+	step_x = (np.cos(angles) / correction).astype(np.float32)
+	step_y = (np.sin(angles) / correction).astype(np.float32)
+
+	# World coordinates of every floor pixel, indexed [x, y] like the frame buffer.
+	world_x = np.float32(player.pos.x) + step_x[:, None] * perpendicular[None, :]
+	world_y = np.float32(player.pos.y) + step_y[:, None] * perpendicular[None, :]
+
+	cell_x = np.floor_divide(world_x, cell_size)
+	cell_y = np.floor_divide(world_y, cell_size)
+	offset_x = world_x - cell_x * cell_size
+	offset_y = world_y - cell_y * cell_size
+
+	pixels = frame_buffer.pixels[:, ys[0]:ys[-1] + 1]
+	pixels[:] = 255
+	grid_line = (np.minimum(offset_x, cell_size - offset_x) < delta) | (np.minimum(offset_y, cell_size - offset_y) < delta)
+	pixels[grid_line] = 128
+
+	if path_bitmap is not None:
+		half = cell_size / 2.0
+		near_center = (offset_x - half) ** 2 + (offset_y - half) ** 2 < path_point_size * path_point_size
+		rows = cell_y.astype(np.int64)
+		cols = cell_x.astype(np.int64)
+		near_center &= (rows >= 0) & (rows < path_bitmap.rows) & (cols >= 0) & (cols < path_bitmap.cols)
+		hit_rows = rows[near_center]
+		hit_cols = cols[near_center]
+		on_path = path_bitmap.mask[hit_rows, hit_cols]
+		near_center[near_center] = on_path
+		pixels[near_center] = path_bitmap.colors[hit_rows[on_path], hit_cols[on_path]]
@@ -0,0 +1,63 @@
+import numpy as np
+import pygame
+
+
+class FrameBuffer:
+	def __init__(self, width, height):
+		"""
+		A preallocated off-screen pixel buffer for the 3D view.
+		The renderer writes wall spans and floor colors straight into the NumPy array,
+		and the result is shown with a single blit instead of one draw call per line.
+		- width, height: Size of the buffer in pixels.
+		"""
+		self.width = width
+		self.height = height
+		self.surface = pygame.Surface((width, height))
+		# Indexed as pixels[x, y], matching pygame.surfarray.
+		self.pixels = np.zeros((width, height, 3), dtype=np.uint8)
+		self._rows = np.arange(height)
+
+	def clear(self, color=(255, 255, 255)):
+		self.pixels[:, :] = color
+
+	def draw_column_spans(self, columns, tops, bottoms, colors):
+		"""
+		Fills one vertical span per column, both ends inclusive (like pygame.draw.line).
+		- columns: int array of screen x coordinates.
+		- tops, bottoms: int arrays with the first and last screen row of each span.
+		- colors: (n, 3) uint8 array with the color of each span.
+		"""
+		if len(columns) == 0:
+			return
+		tops = np.maximum(tops, 0)
+		bottoms = np.minimum(bottoms, self.height - 1)
+		inside = (self._rows >= tops[:, None]) & (self._rows <= bottoms[:, None])
+		block = self.pixels[columns]
+		np.copyto(block, colors[:, None, :], where=inside[:, :, None])
+		self.pixels[columns] = block
+
+	def draw_row_span(self, y, x0, x1, color):
+		# Fills pixels x0..x1 (inclusive, in either order) of screen row y.
+		if not 0 <= y < self.height:
+			return
+		if x0 > x1:
+			x0, x1 = x1, x0
+		self.pixels[max(x0, 0):min(x1, self.width - 1) + 1, y] = color
+
+	def present(self, screen, dest=(0, 0)):
+		# Copies the pixels to the backing surface and draws it with one blit.
+		pygame.surfarray.blit_array(self.surface, self.pixels)
+		screen.blit(self.surface, dest)
+
+
+_shared_buffer = None
+
+
+def get_frame_buffer(width, height):
+	"""
+	Returns a FrameBuffer of the requested size, reusing the previous one when the size matches.
+	"""
+	global _shared_buffer
+	if _shared_buffer is None or _shared_buffer.width != width or _shared_buffer.height != height:
+		_shared_buffer = FrameBuffer(width, height)
+	return _shared_buffer
@@ -0,0 +1,174 @@
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import pygame
+
+
+class StageTimer:
+	def __init__(self):
+		"""
+		Collects wall-clock timings of named frame stages (floor, walls, hud, flip, ...).
+		Wrap a stage in `with timer.stage("walls"):`; every pass adds one sample to that stage.
+		Work counters (rays cast, segments drawn, ...) are summed with count().
+		"""
+		self.samples = {}
+		self.counters = {}
+
+	@contextmanager
+	def stage(self, name):
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.record(name, time.perf_counter() - start, start)
+
+	def record(self, name, seconds, start=None):
+		self.samples.setdefault(name, []).append(seconds)
+
+	def count(self, name, amount=1):
+		self.counters[name] = self.counters.get(name, 0) + amount
+
+	def clear(self):
+		self.samples = {}
+		self.counters = {}
+
+	def summary(self, percentiles=(50, 90, 99)):
+		"""
+		Returns {stage: {"count", "mean_ms", "p50_ms", ..., "max_ms"}} over all samples recorded so far.
+		Percentiles use the nearest-rank method.
+		"""
+		result = {}
+		for name, samples in self.samples.items():
+			ordered = sorted(samples)
+			stats = {"count": len(ordered), "mean_ms": sum(ordered) / len(ordered) * 1000}
+			for percentile in percentiles:
+				rank = max(1, math.ceil(percentile / 100 * len(ordered)))
+				stats["p{}_ms".format(percentile)] = ordered[rank - 1] * 1000
+			stats["max_ms"] = ordered[-1] * 1000
+			result[name] = stats
+		return result
+
+
+class _NullTimer:
+	# Stand-in used when no timer is given, so instrumented code needs no branches.
+	@contextmanager
+	def stage(self, name):
+		yield
+
+	def record(self, name, seconds, start=None):
+		pass
+
+	def count(self, name, amount=1):
+		pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class FrameProfiler(StageTimer):
+	def __init__(self, history=600):
+		"""
+		Per-frame instrumentation for the game loop: stage timings, work counters, an on-screen
+		overlay and Chrome trace export. Only the last history frames are kept.
+		Call begin_frame() and end_frame() around every frame and time stages with stage() as with
+		StageTimer; while enabled is False the game should pass NULL_TIMER instead so nothing is recorded.
+		"""
+		super().__init__()
+		self.enabled = False
+		self.frames = deque(maxlen=history)
+		self.epoch = time.perf_counter()
+		self._events = []
+		self._frame_start = None
+		self._thread_id = threading.get_ident()
+
+	def begin_frame(self):
+		self._events = []
+		self.counters = {}
+		self._frame_start = time.perf_counter()
+
+	def record(self, name, seconds, start=None):
+		if self._frame_start is not None:
+			self._events.append((name, start if start is not None else time.perf_counter() - seconds, seconds))
+
+	def end_frame(self):
+		"""
+		Closes the current frame; returns its duration in seconds.
+		"""
+		if self._frame_start is None:
+			return 0.0
+		duration = time.perf_counter() - self._frame_start
+		self.frames.append((self._frame_start, duration, self._events, self.counters))
+		self._frame_start = None
+		return duration
+
+	def clear(self):
+		self.frames.clear()
+		self._events = []
+		self.counters = {}
+
+	def stage_averages(self, frames=30):
+		"""
+		Returns {stage: mean ms per frame} over the last frames frames, in first-seen order.
+		"""
+		recent = list(self.frames)[-frames:]
+		totals = {}
+		for _, _, events, _ in recent:
+			for name, _, seconds in events:
+				totals[name] = totals.get(name, 0.0) + seconds
+		return {name: total / len(recent) * 1000 for name, total in totals.items()}
+
+	def draw_overlay(self, screen, font, graph_frames=120, budget_ms=1000 / 60, notes=()):
+		"""
+		Draws a frame-time graph (the line marks budget_ms), the average time of every stage and the
+		last frame's counters in the top right corner of screen.
+		- notes: Further lines of text to show below them.
+		"""
+		averages = self.stage_averages()
+		counters = self.frames[-1][3] if self.frames else {}
+		lines = ["frame {:.1f} ms".format(sum(frame[1] for frame in list(self.frames)[-30:]) / max(1, min(30, len(self.frames))) * 1000)]
+		lines += ["{} {:.2f} ms".format(name, ms) for name, ms in averages.items()]
+		lines += ["{} {}".format(name, value) for name, value in counters.items()]
+		lines += list(notes)
+		graph_height = 60
+		line_height = font.get_linesize()
+		width = max(graph_frames * 2, max(font.size(line)[0] for line in lines)) + 10
+		height = graph_height + 10 + line_height * len(lines) + 5
+		left = screen.get_width() - width - 10
+		panel = pygame.Surface((width, height), pygame.SRCALPHA)
+		panel.fill((0, 0, 0, 180))
+		scale = graph_height / (budget_ms * 2)
+		for i, frame in enumerate(list(self.frames)[-graph_frames:]):
+			ms = frame[1] * 1000
+			bar = min(graph_height, int(ms * scale))
+			color = (80, 220, 80) if ms <= budget_ms else (230, 80, 60)
+			pygame.draw.line(panel, color, (5 + i * 2, 5 + graph_height), (5 + i * 2, 5 + graph_height - bar))
+		budget_y = 5 + graph_height - int(budget_ms * scale)
+		pygame.draw.line(panel, (200, 200, 200), (5, budget_y), (5 + graph_frames * 2, budget_y))
+		for i, line in enumerate(lines):
+			panel.blit(font.render(line, True, (255, 255, 255)), (5, graph_height + 10 + i * line_height))
+		screen.blit(panel, (left, 10))
+
+	def export_trace(self, file_path):
+		"""
+		Writes the recorded frames as a Chrome trace (chrome://tracing, Perfetto): one complete event per
+		frame and per stage, and a counter event per frame for the counters.
+		Returns the number of frames written.
+		"""
+		events = []
+		for frame_start, duration, stages, counters in self.frames:
+			events.append(self._trace_event("frame", frame_start, duration))
+			for name, start, seconds in stages:
+				events.append(self._trace_event(name, start, seconds))
+			if counters:
+				events.append({"name": "counters", "ph": "C", "ts": (frame_start - self.epoch) * 1e6,
+					"pid": 1, "tid": self._thread_id, "args": counters})
+		with open(file_path, "w") as file:
+			json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+		return len(self.frames)
+
+	def _trace_event(self, name, start, seconds):
+		return {"name": name, "ph": "X", "ts": (start - self.epoch) * 1e6, "dur": seconds * 1e6,
+			"pid": 1, "tid": self._thread_id}
@@ -1,21 +1,58 @@
+import time
+IMPORT_START = time.perf_counter()
 import pygame
 import sys
-import math
-from maze_functions import *
-from rays import *
-from player import *
-from collections import deque
-from ray_caster import draw_view
+import random
+import datetime
+import os
+from player import Player
+from maze_grid import as_maze_grid
+from maze_generators import ALGORITHMS, generate
+from maze_worker import MazePrefetcher
+from maze_cache import CachedMaze, MazeCache
+from endless_maze import ChunkedMazeGrid
+from collision import CollisionMap
+from maze_solver import distance_field
+from placement import PLACEMENTS, PlacementIndex, first_free_cell, place
+from route_tracker import RouteTracker
+from simulation import FixedTimestep
+from instrumentation import FrameProfiler, StageTimer, NULL_TIMER
+from path_store import PathStore
+from session_file import SessionHeader, SessionRecorder, save_session
+from visibility import VisibilityOverlay
+from maze_layer import MazeLayer
+from render_scale import draw_scaled_view, scale_label, ResolutionScaler, RENDER_AUTO, RENDER_SCALES
+# The 3D renderer (ray_caster, parallel_render) is imported on first use; see renderer_3d.
+
+# Startup phases (imports, display, window, first frame, first maze); shown in the F3 overlay.
+startup_timer = StageTimer()
+startup_timer.record("imports", time.perf_counter() - IMPORT_START, IMPORT_START)
 
 WINDOW_SIZE = 1000
 WINDOW_TITLE = "Memory Maze"
 FPS = 60
+SIMULATION_RATE = 120  # simulation ticks per second, independent of the frame rate
+ROTATION_SPEED = 0.1 * FPS  # radians per second when turning with q/e
+MOUSE_TURN = 0.03  # radians per mouse motion event
 
 # Global configuration variables (modifiable in the start screen)
 config_grid_size = 13
 config_time_to_start = 6.0  # in seconds
 config_show_best_route = True
 config_view_distance = 5
+config_floor_mode = "pixels"  # ray_caster.FLOOR_PIXELS or FLOOR_SEGMENTS
+FLOOR_MODES = ["pixels", "segments"]
+config_wall_mode = "textured"  # ray_caster.WALLS_TEXTURED or WALLS_FLAT
+WALL_MODES = ["textured", "flat"]
+config_maze_algorithm = "backtracker"
+config_parallel_render = False  # render the 3D view on all cores (see parallel_render)
+config_render_scale = RENDER_AUTO  # internal 3D resolution: a fraction of the window, or picked from frame times
+RENDER_SCALE_OPTIONS = [RENDER_AUTO] + list(RENDER_SCALES)
+config_seed_mode = "random"  # "random", "daily" or "last" (replay the last maze)
+SEED_MODES = ["random", "daily", "last"]
+config_placement = "furthest"  # where start and goal go: a key of placement.PLACEMENTS
+config_endless = False  # play an endless 3D maze without a goal (see start_endless)
+ROUND_WALK = 15
 path_taken_color=(255, 0,0)
 best_path_color = (0,0,255)
 end_point_color = (0,255,0)
@@ -27,66 +64,296 @@ GRID_SIZE = config_grid_size
 CELL_SIZE = WINDOW_SIZE // GRID_SIZE
 PLAYER_SPEED = CELL_SIZE * 5  # pixels per second
 PATH_SIZE = CELL_SIZE /6
+current_seed = None
+route_tracker = None
+# Set by start_endless, cleared by start_simulation; endless_depth is the deepest cell row reached.
+endless_game = False
+endless_depth = 0
 THREE_D = True
 
-def draw_grid(grid, screen, furthest: pygame.math.Vector2 = None, start: pygame.math.Vector2 = None):
+def draw_grid(grid, screen, furthest: pygame.math.Vector2 = None, start: pygame.math.Vector2 = None, area: pygame.Rect = None):
 	"""
 	Draws the grid on the provided Pygame screen.
-	- grid: A square 2D list of booleans.
-	  True  => black cell (obstacle)
-	  False => white cell (free)
+	- grid: A square MazeGrid.
+	  0 => black cell (obstacle)
+	  1 => white cell (free)
 	- screen: The Pygame surface to draw on.
+	- area: If given (in pixels), only that part of the maze is drawn.
+	The maze is rendered once into maze_layer and blitted from there.
 	"""
-	n = len(grid)
-	cell_size = WINDOW_SIZE // n
-	for row in range(n):
-		for col in range(n):
-			color = (0, 0, 0) if not grid[row][col] else (255, 255, 255)
-			if furthest is not None and furthest.x == row and furthest.y == col:
-				color = (0, 255, 0)
-			if start is not None and start.x == col and start.y == row:
-				color = (255, 0, 0)
-			rect = pygame.Rect(col * cell_size, row * cell_size, cell_size, cell_size)
-			pygame.draw.rect(screen, color, rect)
-			pygame.draw.rect(screen, (128, 128, 128), rect, 1)
-
-
-def draw_path(path, screen, color=(0, 0, 255)):
-	for p in path.keys():
-		pygame.draw.circle(screen, path[p],
+	grid = as_maze_grid(grid)
+	cell_size = WINDOW_SIZE // grid.height
+	goal = (int(furthest.x), int(furthest.y)) if furthest is not None else None
+	start_cell = (int(start.y), int(start.x)) if start is not None else None
+	maze_layer.draw(screen, grid, cell_size, goal, start_cell, area)
+
+
+def draw_path(path, screen, color=(0, 0, 255), visible_area: pygame.Rect = None):
+	"""
+	Draws a dot for every cell of path.
+	- visible_area: If given (in pixels), only the cells of a PathStore inside it are drawn.
+	"""
+	if visible_area is not None and isinstance(path, PathStore):
+		cells = path.cells_in(int(visible_area.top // CELL_SIZE), int(visible_area.left // CELL_SIZE),
+			int(visible_area.bottom // CELL_SIZE), int(visible_area.right // CELL_SIZE))
+	else:
+		cells = path.items()
+	for p, p_color in cells:
+		pygame.draw.circle(screen, p_color,
 			(p[1] * CELL_SIZE + CELL_SIZE / 2, p[0] * CELL_SIZE + CELL_SIZE / 2),
 			PATH_SIZE)
 
 
-def start_simulation(grid_size):
-	global GRID_SIZE, CELL_SIZE, PLAYER_SPEED
+def daily_seed():
+	# The same seed for everyone on a given day, e.g. 20261016.
+	return int(datetime.date.today().strftime("%Y%m%d"))
+
+
+def config_seed():
+	"""
+	Returns the seed for the next maze according to config_seed_mode, or None for a random one.
+	"""
+	if config_seed_mode == "daily":
+		return daily_seed()
+	if config_seed_mode == "last" and current_seed is not None:
+		return current_seed
+	return None
+
+
+def prepare_maze(grid_size, algorithm, seed=None, placement="furthest"):
+	"""
+	Generates and solves a maze, or loads it from maze_cache. Works in cell coordinates only, so it
+	can run on the background prefetcher thread.
+	- seed: Seed of the maze; None picks a random one. Mazes with a chosen seed are written to disk at once,
+	  random ones when maze_cache evicts them (they can still come back with seed mode "last").
+	- placement: Where start and goal go, a key of placement.PLACEMENTS; the same seed always gives
+	  the same start and goal.
+	Returns (grid, start_cell, furthest, path, seed, tracker): start_cell is the start (row, col), by default
+	the first free cell in row-major order, furthest is the goal, by default the cell furthest from the
+	start (as in bfs_furthest), path the best route and tracker a RouteTracker for the run.
+	"""
+	persist = seed is not None
+	if seed is None:
+		seed = random.getrandbits(32)
+	key = (grid_size, grid_size, ROUND_WALK, seed, algorithm)
+	maze = maze_cache.get(key)
+	if maze is None:
+		grid = generate(grid_size, grid_size, ROUND_WALK, algorithm, seed)
+		# The cached solution is the "furthest" one; the first sweep of a PlacementIndex is that solve.
+		index = PlacementIndex(grid) if placement != "furthest" else None
+		from_start = index.from_cell if index is not None else distance_field(grid, *first_free_cell(grid))
+		maze = CachedMaze(grid, from_start.source, from_start.furthest, from_start.path_to(*from_start.furthest))
+		maze.placement_index = index
+		if index is None:
+			maze.routes["furthest"] = (from_start.source, from_start.furthest, from_start, distance_field(grid, *from_start.furthest))
+		maze_cache.put(key, maze, persist)
+	# Routes are solved once per maze and placement and kept with the maze in maze_cache.
+	route = maze.routes.get(placement)
+	if route is None:
+		if placement != "furthest" and maze.placement_index is None:
+			maze.placement_index = PlacementIndex(maze.grid)
+		route = place(maze.grid, placement, seed, maze.placement_index)
+		maze.routes[placement] = route
+		maze_cache.recount(key)
+	start_cell, goal, from_start, to_goal = route
+	tracker = RouteTracker(from_start, to_goal)
+
+	path = {cell: best_path_color for cell in reversed(from_start.path_to(*goal))}
+	return maze.grid, start_cell, pygame.math.Vector2(goal), path, seed, tracker
+
+
+maze_prefetcher = None
+maze_cache = MazeCache()
+
+
+def maze_key(grid_size):
+	# Arguments of prepare_maze for a maze of grid_size with the current configuration.
+	return grid_size, config_maze_algorithm, config_seed(), config_placement
+
+
+def prefetch_mazes():
+	# Keeps mazes ready for the current grid size and its neighbours on the start screen.
+	if maze_prefetcher is not None:
+		sizes = [config_grid_size, config_grid_size + 2] + ([config_grid_size - 2] if config_grid_size > 5 else [])
+		maze_prefetcher.want([maze_key(size) for size in sizes])
+
+
+def start_simulation(grid_size, maze=None):
+	"""
+	Sets up a new game on a maze of grid_size, taken from the prefetcher or prepared right away.
+	- maze: A result of prepare_maze to use instead.
+	"""
+	global GRID_SIZE, CELL_SIZE, PLAYER_SPEED, current_seed, route_tracker, endless_game
+	endless_game = False
 	GRID_SIZE = grid_size
 	CELL_SIZE = WINDOW_SIZE // GRID_SIZE
 	PLAYER_SPEED = CELL_SIZE * 7
-	grid = generate_maze(GRID_SIZE, GRID_SIZE, 15)
-
-	player_start = None
-	for row in range(GRID_SIZE):
-		for col in range(GRID_SIZE):
-			if grid[row][col]:  # white cell is free
-				player_start = pygame.math.Vector2((col + 0.5) * CELL_SIZE, (row + 0.5) * CELL_SIZE)
-				break
-		if player_start:
-			break
-	if player_start is None:
-		player_start = pygame.math.Vector2(WINDOW_SIZE / 2, WINDOW_SIZE / 2)
-	furthest, path = bfs_furthest(int(player_start.y / CELL_SIZE), int(player_start.x / CELL_SIZE), grid, best_path_color)
-
+	key = maze_key(grid_size)
+	if maze is None and maze_prefetcher is not None:
+		maze = maze_prefetcher.take(key)
+	if maze is None:
+		maze = prepare_maze(*key)
+	grid, start_cell, furthest, path, current_seed, route_tracker = maze
+	route_tracker.reset()
+
+	player_start = pygame.math.Vector2((start_cell[1] + 0.5) * CELL_SIZE, (start_cell[0] + 0.5) * CELL_SIZE)
 	player_radius = CELL_SIZE * 0.3
-	player = Player(player_start, player_radius, PLAYER_SPEED)
-	player_start_cell = player_start / CELL_SIZE
-	player_start_cell.x = int(player_start_cell.x)
-	player_start_cell.y = int(player_start_cell.y)
-	path_taken = {(int(player_start_cell.y), int(player_start_cell.x)): path_taken_color,
-				  (int(furthest.x), int(furthest.y)): end_point_color}
+	player = Player(player_start, player_radius, PLAYER_SPEED, collision_map=CollisionMap(grid, CELL_SIZE, player_radius))
+	player_start_cell = pygame.math.Vector2(start_cell[1], start_cell[0])
+	path = PathStore(GRID_SIZE, GRID_SIZE, path)
+	path_taken = PathStore(GRID_SIZE, GRID_SIZE, {(int(player_start_cell.y), int(player_start_cell.x)): path_taken_color,
+				  (int(furthest.x), int(furthest.y)): end_point_color})
 	return grid, player, furthest, player_start_cell, path, path_taken, PLAYER_SPEED
 
 
+def start_endless(grid_size):
+	"""
+	Sets up an endless game: a maze grid_size cells wide that goes on downwards for as long as the player
+	walks (see endless_maze.ChunkedMazeGrid). It has no goal, no best route and no map, and is played in
+	3D; only the chunks around the player are kept in memory (endless_tick loads them as the player moves).
+	Returns the same values as start_simulation, with an empty best route and path taken.
+	"""
+	global GRID_SIZE, CELL_SIZE, PLAYER_SPEED, current_seed, route_tracker, endless_game, endless_depth
+	GRID_SIZE = grid_size
+	CELL_SIZE = WINDOW_SIZE // GRID_SIZE
+	PLAYER_SPEED = CELL_SIZE * 7
+	current_seed = config_seed()
+	if current_seed is None:
+		current_seed = random.getrandbits(32)
+	reach = endless_reach()
+	# Enough chunks for the rows within reach above and below the player, and one being entered.
+	grid = ChunkedMazeGrid(grid_size, current_seed, max_chunks=max(8, 2 * reach // 32 + 3))
+	route_tracker = None
+	endless_game = True
+	endless_depth = 0
+	# Grid row 1 holds the first cell row; its first cell is in column 1.
+	grid.prefetch(1, reach)
+	player_radius = CELL_SIZE * 0.3
+	# The grid is read through is_free (player.circle_collides): a CollisionMap would need the whole maze.
+	player = Player(pygame.math.Vector2(1.5 * CELL_SIZE, 1.5 * CELL_SIZE), player_radius, PLAYER_SPEED)
+	# A goal outside the maze is never reached.
+	return grid, player, pygame.math.Vector2(-1, -1), pygame.math.Vector2(1, 1), {}, {}, PLAYER_SPEED
+
+
+def endless_reach():
+	# Grid rows around the player the 3D view reads (see batch_rays.grid_window).
+	return int(config_view_distance) + 2
+
+
+def three_d_game():
+	# Endless mazes have no 2D view; they are played in 3D whatever the 3D setting says.
+	return THREE_D or endless_game
+
+
+def move_player(player, grid, keys, step):
+	# Turns and moves the player by one simulation step from the pressed keys.
+	player.begin_tick()
+	movement = pygame.math.Vector2(0, 0)
+	if keys[pygame.K_w] or keys[pygame.K_UP]:
+		movement.y -= 1
+	if keys[pygame.K_s] or keys[pygame.K_DOWN]:
+		movement.y += 1
+
+	if keys[pygame.K_e]:
+		player.orientation += ROTATION_SPEED * step
+	if keys[pygame.K_q]:
+		player.orientation -= ROTATION_SPEED * step
+	player.normalize_orientation()
+
+	if keys[pygame.K_a] or keys[pygame.K_LEFT]:
+		movement.x -= 1
+	if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
+		movement.x += 1
+	if three_d_game():
+		player.move_3d(movement, grid, CELL_SIZE, step)
+	else:
+		player.move(movement, grid, CELL_SIZE, step)
+
+
+def simulation_tick(player, grid, furthest, path_taken, keys, step):
+	"""
+	Advances the game by one fixed simulation step of step seconds: turns and moves the player from the
+	pressed keys and records the cells it enters.
+	- keys: Pressed-key state, as returned by pygame.key.get_pressed().
+	Returns True once the player has reached the furthest cell.
+	"""
+	move_player(player, grid, keys, step)
+
+	# Update path taken if the player moves to a new cell
+	current_cell = (int(player.pos.y / CELL_SIZE), int(player.pos.x / CELL_SIZE))
+	if current_cell not in path_taken.keys():
+		path_taken[current_cell] = path_taken_color
+	if current_cell != route_tracker.current:
+		route_tracker.enter(current_cell)
+
+	# Check if the player has reached the furthest cell
+	if current_cell == (int(furthest.x), int(furthest.y)):
+		player.pos.y = furthest.x * CELL_SIZE + CELL_SIZE / 2
+		player.pos.x = furthest.y * CELL_SIZE + CELL_SIZE / 2
+		player.begin_tick()
+		return True
+	return False
+
+
+def endless_tick(player, grid, keys, step):
+	"""
+	Advances an endless game by one fixed simulation step: moves the player as simulation_tick does and
+	has the maze chunks within endless_reach of the player's row generated.
+	"""
+	global endless_depth
+	move_player(player, grid, keys, step)
+	row = int(player.pos.y // CELL_SIZE)
+	grid.prefetch(row, endless_reach())
+	endless_depth = max(endless_depth, row // 2)
+
+
+resolution_scaler = ResolutionScaler()
+visibility_overlay = VisibilityOverlay()
+maze_layer = MazeLayer()
+# Screen band holding the HUD text of the running game.
+HUD_HEIGHT = 95
+
+
+def render_scale():
+	# Internal resolution to draw the 3D view at this frame.
+	return resolution_scaler.scale if config_render_scale == RENDER_AUTO else config_render_scale
+
+
+def renderer_3d():
+	"""
+	Returns the function that draws the 3D view: ray_caster.draw_view, or the parallel renderer's.
+	The renderer is imported on the first call rather than at startup, so the window opens without
+	waiting for it and a game played in 2D never loads it.
+	"""
+	if config_parallel_render:
+		from parallel_render import get_parallel_renderer
+		return get_parallel_renderer().draw_view
+	from ray_caster import draw_view
+	return draw_view
+
+
+def draw_hud(screen, font, elapsed_time, path, path_taken):
+	# Game statistics shown in the top left corner while the simulation runs (within HUD_HEIGHT pixels).
+	time_text = font.render("Elapsed Time: {:.2f} s".format(elapsed_time), True, (128, 128, 128))
+	best_path_length_text = font.render("Best Path Length: {:.2f}".format(len(path)), True, (128, 128, 128))
+	path_taken_text = font.render("Path Taken Length: {:.2f}".format(len(path_taken)), True, (128, 128, 128))
+	route_text = font.render("Extra Steps: {}  Off Route: {}  Backtracks: {}  Wasted Cells: {}".format(
+		route_tracker.extra_steps, route_tracker.off_route, route_tracker.backtracks, route_tracker.wasted_cells),
+		True, (128, 128, 128))
+	screen.blit(time_text, (10, 10))
+	screen.blit(best_path_length_text, (10, 30))
+	screen.blit(path_taken_text, (10, 50))
+	screen.blit(route_text, (10, 70))
+
+
+def draw_endless_hud(screen, font, elapsed_time, grid):
+	# Statistics of an endless game, in place of draw_hud.
+	lines = ["Elapsed Time: {:.2f} s".format(elapsed_time), "Depth: {} rows".format(endless_depth),
+		"Maze chunks in memory: {}".format(len(grid.loaded_chunks()))]
+	for i, line in enumerate(lines):
+		screen.blit(font.render(line, True, (128, 128, 128)), (10, 10 + i * 20))
+
+
 def draw_start_screen(screen, font):
 	# Create a semi-transparent overlay
 	overlay = pygame.Surface((WINDOW_SIZE, WINDOW_SIZE))
@@ -102,6 +369,16 @@ def draw_start_screen(screen, font):
 		"View Distance (tiles): {:.0f} (-/= keys)".format(config_view_distance),
 		"Show Best Route: {} (Press B to toggle)".format("[X]" if config_show_best_route else "[ ]"),
 		"3D mode: {} (Press D to toggle)".format("[X]" if THREE_D else "[ ]"),
+		"Floor rendering: {} (Press F to toggle)".format(config_floor_mode),
+		"Walls: {} (Press T to toggle)".format(config_wall_mode),
+		"Parallel rendering: {} (Press P to toggle)".format("[X]" if config_parallel_render else "[ ]"),
+		"Render resolution: {} (Press V to change)".format(scale_label(config_render_scale) if config_render_scale != RENDER_AUTO
+			else "auto ({})".format(scale_label(resolution_scaler.scale))),
+		"Maze algorithm: {} (Press G to change)".format(config_maze_algorithm),
+		"Seed: {} {} (Press S to change)".format(config_seed_mode, config_seed() if config_seed() is not None else ""),
+		"Start and goal: {} (Press L to change)".format(config_placement if config_placement in ("furthest", "diameter")
+			else "{} of the diameter apart".format(config_placement)),
+		"Endless maze (3D, no goal): {} (Press N to toggle)".format("[X]" if config_endless else "[ ]"),
 		"Press ENTER to start simulation"
 	]
 
@@ -123,6 +400,7 @@ def draw_end_screen(screen, font, best_length, taken_length, percent_diff):
 		"Best Path Length: {}".format(best_length),
 		"Your Path Length: {}".format(taken_length),
 		"Extra Steps: {:.2f}%".format(percent_diff),
+		"Maze Seed: {} (replay it with seed mode \"last\")".format(current_seed),
 		"Press ENTER to return to Start Screen"
 	]
 
@@ -150,20 +428,78 @@ def set_window_size():
 	# Adjust square size to fit within the available screen space
 	WINDOW_SIZE -= CELL_SIZE
 
-	# Close temp window
-	pygame.display.quit()
 
-def main():
-	global config_grid_size, config_time_to_start, config_show_best_route, PLAYER_SPEED, config_view_distance, WINDOW_SIZE, THREE_D, PATH_SIZE
-	pygame.init()
+def start_recording():
+	# Recorder for the game that starts now (see session_file and replay.py).
+	return SessionRecorder(SessionHeader(GRID_SIZE, ROUND_WALK, current_seed, config_maze_algorithm, WINDOW_SIZE,
+		SIMULATION_RATE, THREE_D, config_view_distance, config_floor_mode, config_placement))
+
+
+def save_recording(recorder, reached_goal, player, path_taken):
+	# Keeps the finished game in the replay directory; failing to write it must not stop the game.
+	try:
+		save_session(recorder.finish(reached_goal, player, path_taken))
+	except OSError:
+		pass
+
+
+def quit_game(recorder, player, path_taken):
+	# Closing the window and ESC end the program the same way: the running game is recorded first.
+	if recorder is not None:
+		save_recording(recorder, False, player, path_taken)
+	maze_prefetcher.stop()
+	maze_cache.flush()
+	pygame.quit()
+	sys.exit()
 
-	set_window_size()
 
-	screen = pygame.display.set_mode((WINDOW_SIZE, WINDOW_SIZE))
-	pygame.display.set_caption(WINDOW_TITLE)
-	pygame.mouse.set_visible(False)
-	clock = pygame.time.Clock()
-	font = pygame.font.SysFont(None, 30)
+def startup_phases():
+	# Startup phase timings as text, e.g. ["imports 120 ms", "display_init 15 ms", ...].
+	return ["{} {:.0f} ms".format(name, samples[-1] * 1000) for name, samples in startup_timer.samples.items()]
+
+
+def wait_for_first_maze(screen, font, clock):
+	"""
+	Shows the window at once and keeps it responsive while the prefetcher generates the first maze.
+	Returns the maze (a result of prepare_maze).
+	"""
+	waiting_start = time.perf_counter()
+	first_frame = True
+	while True:
+		# The first clock.tick(FPS) also starts SDL's timer, which pygame.time.get_ticks needs without pygame.init().
+		clock.tick(FPS)
+		for event in pygame.event.get():
+			if event.type == pygame.QUIT:
+				maze_prefetcher.stop()
+				pygame.quit()
+				sys.exit()
+		maze = maze_prefetcher.take(maze_key(config_grid_size))
+		if maze is not None:
+			startup_timer.record("first_maze", time.perf_counter() - waiting_start, waiting_start)
+			return maze
+		screen.fill((0, 0, 0))
+		text_surface = font.render("Generating maze...", True, (255, 255, 255))
+		screen.blit(text_surface, (WINDOW_SIZE // 2 - text_surface.get_width() // 2, WINDOW_SIZE // 2))
+		pygame.display.flip()
+		if first_frame:
+			startup_timer.record("first_frame", time.perf_counter() - waiting_start, waiting_start)
+			first_frame = False
+
+def main():
+	global config_grid_size, config_time_to_start, config_show_best_route, PLAYER_SPEED, config_view_distance, WINDOW_SIZE, THREE_D, PATH_SIZE, config_floor_mode, config_wall_mode, config_maze_algorithm, maze_prefetcher, config_seed_mode, config_parallel_render, config_render_scale, config_placement, config_endless
+	# Only the subsystems the game uses: pygame.init() would also start audio, joysticks, ...
+	with startup_timer.stage("display_init"):
+		pygame.display.init()
+		pygame.font.init()
+
+	with startup_timer.stage("window"):
+		set_window_size()
+		screen = pygame.display.set_mode((WINDOW_SIZE, WINDOW_SIZE))
+		pygame.display.set_caption(WINDOW_TITLE)
+		pygame.mouse.set_visible(False)
+		clock = pygame.time.Clock()
+		font = pygame.font.SysFont(None, 30)
+		small_font = pygame.font.SysFont(None, 20)
 
 	# State variables
 	in_start_screen = True  # Configuration mode active initially
@@ -171,31 +507,64 @@ def main():
 	end_screen = False     # End screen is active upon reaching furthest cell
 	elapsed_time = 0.0     # Elapsed simulation time (after countdown)
 	simulation_start_time = 0
-
-	# Generate initial maze using default configuration
-	grid, player, furthest, player_start_cell, path, path_taken, PLAYER_SPEED = start_simulation(config_grid_size)
+	# Gameplay runs in fixed ticks; frames draw the player interpolated between the last two ticks.
+	timestep = FixedTimestep(SIMULATION_RATE)
+	# F3 shows the instrumentation overlay (and records frames), F4 exports them as a Chrome trace.
+	profiler = FrameProfiler()
+	trace_message = None
+	# Area around the player drawn in the last dirty-rect frame of the 2D view, None after a full frame.
+	last_view_area = None
+	# Every game is recorded for replay.py: the keys of each tick and the mouse turns taken before it.
+	recorder = None
+
+	# Mazes are generated and solved in the background; see maze_worker.MazePrefetcher.
+	maze_prefetcher = MazePrefetcher(prepare_maze)
+	prefetch_mazes()
+
+	# Initial maze using default configuration, generated in the background while the window is shown
+	grid, player, furthest, player_start_cell, path, path_taken, PLAYER_SPEED = start_simulation(
+		config_grid_size, wait_for_first_maze(screen, font, clock))
+	startup_timer.record("total", time.perf_counter() - IMPORT_START, IMPORT_START)
+	if "--startup-timings" in sys.argv[1:]:
+		print("Startup: " + ", ".join(startup_phases()))
 
 	while True:
-		dt = clock.tick(FPS) / 1000.0
+		frame_time = clock.tick(FPS) / 1000.0
+		frame_start = time.perf_counter()
+		timer = profiler if profiler.enabled else NULL_TIMER
+		if profiler.enabled:
+			profiler.begin_frame()
 
 		# Event processing
+		events_start = time.perf_counter()
 		for event in pygame.event.get():
-			if event.type == pygame.QUIT:
-				pygame.quit()
-				sys.exit()
-			elif event.type == pygame.KEYDOWN and  event.key == pygame.K_ESCAPE:
-				pygame.quit()
+			if event.type == pygame.QUIT or event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+				quit_game(recorder, player, path_taken)
+			elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+				profiler.enabled = not profiler.enabled
+				profiler.clear()
+				continue
+			elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+				trace_path = os.path.join(os.getcwd(), "memory_maze_trace_{}.json".format(datetime.datetime.now().strftime("%Y%m%d_%H%M%S")))
+				try:
+					frames = profiler.export_trace(trace_path)
+					trace_message = ("Trace of {} frames saved to {}".format(frames, trace_path), pygame.time.get_ticks())
+				except OSError as error:
+					trace_message = ("Trace not saved: {}".format(error), pygame.time.get_ticks())
+				continue
 			if in_start_screen:
 				if event.type == pygame.KEYDOWN:
 					if event.key == pygame.K_UP:
 						config_grid_size += 2
 						grid, player, furthest, player_start_cell, path, path_taken, PLAYER_SPEED = start_simulation(config_grid_size)
+						prefetch_mazes()
 						PLAYER_SPEED = CELL_SIZE * 5
 						PATH_SIZE = CELL_SIZE / 4
 					elif event.key == pygame.K_DOWN:
 						if config_grid_size > 5:
 							config_grid_size -= 2
 							grid, player, furthest, player_start_cell, path, path_taken, PLAYER_SPEED = start_simulation(config_grid_size)
+							prefetch_mazes()
 							PLAYER_SPEED = CELL_SIZE * 5
 							PATH_SIZE = CELL_SIZE / 4
 					elif event.key == pygame.K_RIGHT:
@@ -212,9 +581,39 @@ def main():
 						config_show_best_route = not config_show_best_route
 					elif event.key == pygame.K_d:
 						THREE_D = not THREE_D
+					elif event.key == pygame.K_f:
+						config_floor_mode = FLOOR_MODES[(FLOOR_MODES.index(config_floor_mode) + 1) % len(FLOOR_MODES)]
+					elif event.key == pygame.K_t:
+						config_wall_mode = WALL_MODES[(WALL_MODES.index(config_wall_mode) + 1) % len(WALL_MODES)]
+					elif event.key == pygame.K_p:
+						config_parallel_render = not config_parallel_render
+					elif event.key == pygame.K_v:
+						config_render_scale = RENDER_SCALE_OPTIONS[(RENDER_SCALE_OPTIONS.index(config_render_scale) + 1) % len(RENDER_SCALE_OPTIONS)]
+					elif event.key == pygame.K_s:
+						config_seed_mode = SEED_MODES[(SEED_MODES.index(config_seed_mode) + 1) % len(SEED_MODES)]
+						prefetch_mazes()
+						grid, player, furthest, player_start_cell, path, path_taken, PLAYER_SPEED = start_simulation(config_grid_size)
+					elif event.key == pygame.K_l:
+						placements = list(PLACEMENTS)
+						config_placement = placements[(placements.index(config_placement) + 1) % len(placements)]
+						prefetch_mazes()
+						grid, player, furthest, player_start_cell, path, path_taken, PLAYER_SPEED = start_simulation(config_grid_size)
+					elif event.key == pygame.K_n:
+						config_endless = not config_endless
+					elif event.key == pygame.K_g:
+						algorithms = list(ALGORITHMS)
+						config_maze_algorithm = algorithms[(algorithms.index(config_maze_algorithm) + 1) % len(algorithms)]
+						prefetch_mazes()
+						grid, player, furthest, player_start_cell, path, path_taken, PLAYER_SPEED = start_simulation(config_grid_size)
 					elif event.key == pygame.K_RETURN:
 						# End configuration mode and begin simulation (countdown starts)
-						grid, player, furthest, player_start_cell, path, path_taken, PLAYER_SPEED = start_simulation(config_grid_size)
+						if config_endless:
+							grid, player, furthest, player_start_cell, path, path_taken, PLAYER_SPEED = start_endless(config_grid_size)
+						else:
+							grid, player, furthest, player_start_cell, path, path_taken, PLAYER_SPEED = start_simulation(config_grid_size)
+						if THREE_D or config_endless:
+							# Load the 3D renderer now, while the countdown runs, not on the first 3D frame.
+							renderer_3d()
 						in_start_screen = False
 						active = False
 						end_screen = False
@@ -236,22 +635,31 @@ def main():
 					if event.type == pygame.KEYDOWN:
 						if event.key == pygame.K_r:
 							# Restart simulation and go back to configuration
+							if recorder is not None:
+								save_recording(recorder, False, player, path_taken)
+								recorder = None
 							in_start_screen = True
 							active = False
 							simulation_start_time = pygame.time.get_ticks()
 							elapsed_time = 0.0
 							grid, player, furthest, player_start_cell, path, path_taken, PLAYER_SPEED = start_simulation(config_grid_size)
 						elif event.key == pygame.K_ESCAPE:
-							pygame.quit()
+							quit_game(recorder, player, path_taken)
 					elif event.type == pygame.MOUSEMOTION and active:
 						# event.rel gives the relative movement (dx, dy)
 						dx, dy = event.rel
 						if dx < 0:
-							player.orientation -= 0.03
+							player.rotate(-MOUSE_TURN)
+							if recorder is not None:
+								recorder.turn(-1)
 						if dx > 0:
-							player.orientation += 0.03
+							player.rotate(MOUSE_TURN)
+							if recorder is not None:
+								recorder.turn(1)
 						pygame.mouse.set_pos(WINDOW_SIZE // 2, WINDOW_SIZE // 2)
 
+		timer.record("events", time.perf_counter() - events_start, events_start)
+
 		# In configuration mode, freeze countdown by resetting simulation_start_time
 		if in_start_screen:
 			simulation_start_time = pygame.time.get_ticks()
@@ -262,62 +670,77 @@ def main():
 			if not active and pygame.time.get_ticks() - simulation_start_time > config_time_to_start * 1000:
 				active = True
 				elapsed_time = 0.0
+				timestep.reset()
+				player.begin_tick()
+				# Endless games are not recorded: replay.py needs a maze with a goal.
+				recorder = None if endless_game else start_recording()
 
-			# Simulation active: process movement and update player's path
-			if active:
+			# Simulation active: run the fixed ticks due for this frame
+			elif active:
 				keys = pygame.key.get_pressed()
-				movement = pygame.math.Vector2(0, 0)
-				if keys[pygame.K_w] or keys[pygame.K_UP]:
-					movement.y -= 1
-				if keys[pygame.K_s] or keys[pygame.K_DOWN]:
-					movement.y += 1
-
-				if keys[pygame.K_e]:
-					player.orientation += 0.1
-				if keys[pygame.K_q]:
-					player.orientation -= 0.1
-				player.normalize_orientation()
-				
-				if keys[pygame.K_a] or keys[pygame.K_LEFT]:
-					movement.x -= 1
-				if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
-					movement.x += 1
-				if THREE_D:
-					player.move_3d(movement, grid, CELL_SIZE, dt)
-				else:
-					player.move(movement, grid, CELL_SIZE, dt)
-
-				# Update path taken if the player moves to a new cell
-				current_cell = (int(player.pos.y / CELL_SIZE), int(player.pos.x / CELL_SIZE))
-				if current_cell not in path_taken.keys():
-					path_taken[current_cell] = path_taken_color
-
-				# Check if the player has reached the furthest cell
-				if (int(player.pos.y / CELL_SIZE) == int(furthest.x) and
-				    int(player.pos.x / CELL_SIZE) == int(furthest.y)):
-					player.pos.y = furthest.x * CELL_SIZE + CELL_SIZE / 2
-					player.pos.x = furthest.y * CELL_SIZE + CELL_SIZE / 2
-					end_screen = True
-					active = False
-
-			# Update elapsed simulation time (only when simulation is active)
-			if active:
-				elapsed_time += dt
+				with timer.stage("simulation"):
+					for _ in range(timestep.advance(frame_time)):
+						elapsed_time += timestep.step
+						if endless_game:
+							endless_tick(player, grid, keys, timestep.step)
+							continue
+						recorder.tick(keys)
+						if simulation_tick(player, grid, furthest, path_taken, keys, timestep.step):
+							end_screen = True
+							active = False
+							save_recording(recorder, True, player, path_taken)
+							recorder = None
+							break
 
 		# Drawing section
-
-		if not THREE_D:
+		three_d = three_d_game()
+		view = player.interpolated(timestep.alpha) if active else player
+
+		# While the 2D game runs only the area around the player and the HUD change: redraw just those
+		# and update them with display.update(rects) instead of redrawing and flipping the whole screen.
+		partial = active and not three_d and not profiler.enabled and (trace_message is None or pygame.time.get_ticks() - trace_message[1] >= 3000)
+		if partial:
+			view_distance = config_view_distance * CELL_SIZE
+			view_area = pygame.Rect(view.pos.x - view_distance, view.pos.y - view_distance, 2 * view_distance, 2 * view_distance)
+			view_area = view_area.inflate(4, 4).clip(screen.get_rect())
+			if last_view_area is None:
+				dirty = [screen.get_rect()]
+			else:
+				dirty = [view_area.union(last_view_area), pygame.Rect(0, 0, WINDOW_SIZE, HUD_HEIGHT)]
+			last_view_area = view_area
+			for area in dirty:
+				screen.set_clip(area)
+				screen.fill((0, 0, 0))
+				draw_grid(grid, screen, furthest, player_start_cell, area)
+				draw_path(path_taken, screen, (128, 0, 0), area.clip(view_area))
+			screen.set_clip(None)
+			with timer.stage("visibility"):
+				rays_cast = visibility_overlay.draw(view, grid, CELL_SIZE, view_distance, screen, dirty)
+			timer.count("visibility_rays", rays_cast)
+			draw_hud(screen, font, elapsed_time, path, path_taken)
+			view.draw(screen)
+			with timer.stage("flip"):
+				pygame.display.update(dirty)
+			continue
+		last_view_area = None
+
+		if not three_d:
 			screen.fill((0, 0, 0))
 		else:
 			screen.fill((255, 255, 255))
-		if not active or active and not THREE_D:
+		if (not active or active and not three_d) and not endless_game:
 			draw_grid(grid, screen, furthest, player_start_cell)
 
 		# Always draw the best and taken paths on the map
 		if config_show_best_route and not active or end_screen:
 			draw_path(path, screen)
-		if not active or active and not THREE_D:
+		if not active:
 			draw_path(path_taken, screen, (128, 0, 0))
+		elif not three_d:
+			# Only the part of the path around the player can show through the visibility overlay.
+			view_distance = config_view_distance * CELL_SIZE
+			visible_area = pygame.Rect(view.pos.x - view_distance, view.pos.y - view_distance, 2 * view_distance, 2 * view_distance)
+			draw_path(path_taken, screen, (128, 0, 0), visible_area)
 
 		if in_start_screen:
 			# Draw the configuration overlay (start screen)
@@ -337,21 +760,31 @@ def main():
 				countdown_text = font.render("Time to start: {:.2f} s".format(remaining), True, (128, 128, 128))
 				screen.blit(countdown_text, (10, 10))
 			else:
-				if THREE_D:
-					draw_view(player, grid, CELL_SIZE, config_view_distance * CELL_SIZE, screen, WINDOW_SIZE, WINDOW_SIZE, path_taken, PATH_SIZE)
+				if three_d:
+					draw_scaled_view(renderer_3d(), render_scale(), view, grid, CELL_SIZE, config_view_distance * CELL_SIZE, screen, WINDOW_SIZE, WINDOW_SIZE, None if endless_game else path_taken, PATH_SIZE, floor_mode=config_floor_mode, timer=timer, wall_mode=config_wall_mode)
 				else:
-					draw_polygon_from_rays(player, grid, CELL_SIZE, config_view_distance * CELL_SIZE, screen, 1)
+					with timer.stage("visibility"):
+						rays_cast = visibility_overlay.draw(view, grid, CELL_SIZE, config_view_distance * CELL_SIZE, screen)
+					timer.count("visibility_rays", rays_cast)
 					# Simulation active: show elapsed time and other info
-				time_text = font.render("Elapsed Time: {:.2f} s".format(elapsed_time), True, (128, 128, 128))
-				best_path_length_text = font.render("Best Path Length: {:.2f}".format(len(path)), True, (128, 128, 128))
-				path_taken_text = font.render("Path Taken Length: {:.2f}".format(len(path_taken)), True, (128, 128, 128))
-				screen.blit(time_text, (10, 10))
-				screen.blit(best_path_length_text, (10, 30))
-				screen.blit(path_taken_text, (10, 50))
-
-		if not THREE_D:
-			player.draw(screen)
-		pygame.display.flip()
+				if endless_game:
+					draw_endless_hud(screen, font, elapsed_time, grid)
+				else:
+					draw_hud(screen, font, elapsed_time, path, path_taken)
+
+		if not three_d:
+			view.draw(screen)
+		if profiler.enabled:
+			profiler.draw_overlay(screen, small_font, notes=["startup " + phase for phase in startup_phases()])
+		if trace_message is not None and pygame.time.get_ticks() - trace_message[1] < 3000:
+			screen.blit(small_font.render(trace_message[0], True, (128, 128, 128)), (10, WINDOW_SIZE - 25))
+		with timer.stage("flip"):
+			pygame.display.flip()
+		if profiler.enabled:
+			profiler.end_frame()
+		if active and three_d and config_render_scale == RENDER_AUTO:
+			# Work time only: the wait for the frame cap in clock.tick is not counted.
+			resolution_scaler.update(time.perf_counter() - frame_start)
 
 
 if __name__ == '__main__':
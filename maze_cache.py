@@ -0,0 +1,191 @@
+import os
+import queue
+import threading
+from collections import OrderedDict
+from maze_file import MazeHeader, read_maze, write_maze
+
+
+def default_cache_directory():
+	base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+	return os.path.join(base, "memory_maze")
+
+
+class CachedMaze:
+	def __init__(self, grid, start, goal, path_cells):
+		"""
+		A generated and solved maze.
+		- grid: The MazeGrid.
+		- start, goal: (row, col) of the start cell and of the furthest cell from it.
+		- path_cells: The best path as (row, col) cells from start to goal.
+		Solves made for the game are kept with the maze in memory (not on disk), so a maze served again
+		is not solved again:
+		- routes: {placement: (start, goal, from_start, to_goal)}, see placement.place.
+		- placement_index: The maze's placement.PlacementIndex once a placement needed it, else None.
+		"""
+		self.grid = grid
+		self.start = start
+		self.goal = goal
+		self.path_cells = path_cells
+		self.routes = {}
+		self.placement_index = None
+
+	@property
+	def size(self):
+		# Approximate memory footprint in bytes: 8 bytes per cell for every distance field kept.
+		cells = self.grid.width * self.grid.height
+		fields = 2 * len(self.routes) + (4 if self.placement_index is not None else 0)
+		return cells * (1 + 8 * fields) + 64 * len(self.path_cells)
+
+
+class MazeCache:
+	def __init__(self, directory=None, max_bytes=64 * 1024 * 1024, max_disk_bytes=256 * 1024 * 1024):
+		"""
+		Cache of solved mazes keyed by (width, height, round_walk, seed, algorithm).
+		Recent entries are kept in memory in LRU order until their total size exceeds max_bytes; evicted
+		entries spill to disk in the maze_file format (bit-packed walls, start, goal and best path), so
+		they and the entries of earlier runs load without regenerating. Spills are written by a writer
+		thread of the cache, not by the thread whose put or get evicted them. Entries put with persist=True
+		(mazes with a chosen seed, which are asked for again in later runs) are written right away.
+		- directory: Where the files go (default: ~/.cache/memory_maze); an empty string disables the disk layer.
+		- max_bytes: Memory budget of the in-memory layer.
+		- max_disk_bytes: Budget of the maze files in directory; the least recently written go first.
+		The cache is safe to use from the maze prefetcher thread and the main loop at the same time.
+		"""
+		self.directory = default_cache_directory() if directory is None else directory
+		self.max_bytes = max_bytes
+		self.max_disk_bytes = max_disk_bytes
+		# key -> (maze, size counted in _bytes); a maze grows after it is put (see recount).
+		self._entries = OrderedDict()
+		# Keys of the in-memory entries that are also on disk, so evicting them writes nothing.
+		self._stored = set()
+		self._bytes = 0
+		# Evicted entries queued for the writer thread; get still serves them until they are written.
+		self._pending = {}
+		self._spills = queue.Queue()
+		self._writer = None
+		# Size of the maze files in directory, counted by a scan on the first write and kept up to date after.
+		self._disk_bytes = None
+		self._lock = threading.Lock()
+
+	def _file_path(self, key):
+		width, height, round_walk, seed, algorithm = key
+		return os.path.join(self.directory, "{}x{}_rw{}_{}_{}.maze".format(width, height, round_walk, algorithm, seed))
+
+	def get(self, key):
+		"""
+		Returns the CachedMaze for key, or None if it is neither in memory nor on disk.
+		"""
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None:
+				self._entries.move_to_end(key)
+				return entry[0]
+			maze = self._pending.get(key)
+		if maze is not None:
+			# Its file is being written, so it need not be written again.
+			self._remember(key, maze, True)
+			return maze
+		if not self.directory:
+			return None
+		try:
+			grid, header, path_cells = read_maze(self._file_path(key))
+		except (OSError, ValueError):
+			return None
+		maze = CachedMaze(grid, header.start, header.goal, path_cells)
+		self._remember(key, maze, True)
+		return maze
+
+	def put(self, key, maze, persist=True):
+		"""
+		Adds maze under key. With persist it is written to disk now, otherwise once it is evicted from memory.
+		"""
+		self._remember(key, maze, persist and self._store(key, maze))
+
+	def recount(self, key):
+		# Updates the memory counted for the entry of key after its maze grew (new routes or index).
+		self._remember(key, None, False)
+
+	def flush(self):
+		"""
+		Waits until the spilled entries are written, e.g. before the program exits.
+		"""
+		self._spills.join()
+
+	def _store(self, key, maze):
+		# Writes maze to disk; returns whether it was written.
+		if not self.directory:
+			return False
+		width, height, round_walk, seed, algorithm = key
+		file_path = self._file_path(key)
+		try:
+			os.makedirs(self.directory, exist_ok=True)
+			header = MazeHeader(width, height, round_walk, seed, maze.start, maze.goal, algorithm=algorithm)
+			write_maze(file_path, maze.grid, header, maze.path_cells)
+			size = os.path.getsize(file_path)
+		except OSError:
+			# The cache is an optimization; a read-only home directory must not break the game.
+			return False
+		with self._lock:
+			if self._disk_bytes is not None:
+				self._disk_bytes += size
+			trim = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+		if trim:
+			self._trim_disk()
+		return True
+
+	def _remember(self, key, maze, stored):
+		# Adds maze under key (with maze None: counts the entry of key again, if it is still in memory)
+		# and evicts the least recently used entries past max_bytes.
+		spilled = []
+		with self._lock:
+			if maze is None:
+				if key not in self._entries:
+					return
+				maze = self._entries[key][0]
+			if key in self._entries:
+				self._bytes -= self._entries.pop(key)[1]
+			size = maze.size
+			self._entries[key] = (maze, size)
+			self._bytes += size
+			if stored:
+				self._stored.add(key)
+			while self._bytes > self.max_bytes and len(self._entries) > 1:
+				evicted_key, (evicted, size) = self._entries.popitem(last=False)
+				self._bytes -= size
+				if evicted_key in self._stored:
+					self._stored.discard(evicted_key)
+				elif self.directory:
+					self._pending[evicted_key] = evicted
+					spilled.append((evicted_key, evicted))
+			if spilled and self._writer is None:
+				self._writer = threading.Thread(target=self._write_spills, name="maze-cache-writer", daemon=True)
+				self._writer.start()
+		for item in spilled:
+			self._spills.put(item)
+
+	def _write_spills(self):
+		while True:
+			key, maze = self._spills.get()
+			self._store(key, maze)
+			with self._lock:
+				if self._pending.get(key) is maze:
+					del self._pending[key]
+			self._spills.task_done()
+
+	def _trim_disk(self):
+		# Deletes the least recently written maze files until they fit in max_disk_bytes and
+		# counts the size of the files kept.
+		try:
+			files = sorted((entry for entry in os.scandir(self.directory) if entry.name.endswith(".maze")),
+				key=lambda entry: entry.stat().st_mtime, reverse=True)
+			total = 0
+			for entry in files:
+				size = entry.stat().st_size
+				if total + size > self.max_disk_bytes:
+					os.remove(entry.path)
+				else:
+					total += size
+		except OSError:
+			return
+		with self._lock:
+			self._disk_bytes = total
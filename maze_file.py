@@ -0,0 +1,220 @@
+"""
+Compact maze file format.
+
+Layout (little endian):
+	- a 64 byte header (see HEADER): magic, version, width, height, round_walk, seed, start and goal
+	  cells, best path length and the generator algorithm name.
+	- the grid at 1 bit per cell (1 = free), row by row, every row padded to a whole number of bytes
+	  (numpy.packbits(grid, axis=1)).
+	- the best path from start to goal as 2-bit moves (0 up, 1 down, 2 left, 3 right), packed 4 per byte.
+
+read_maze loads a file into a MazeGrid; open_maze memory-maps it instead and reads cells straight
+from the mapped bits, which suits mazes far too large to unpack (10k x 10k and up).
+"""
+import mmap
+import os
+import tempfile
+import struct
+import numpy as np
+from maze_grid import MazeGrid
+
+MAGIC = b"MMAZ"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIiqiiiiI16s")
+HEADER_SIZE = 64
+MOVES = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+class MazeHeader:
+	def __init__(self, width, height, round_walk=-1, seed=0, start=(0, 0), goal=(0, 0), path_length=0, algorithm=""):
+		self.width = width
+		self.height = height
+		self.round_walk = round_walk
+		self.seed = seed
+		self.start = start
+		self.goal = goal
+		self.path_length = path_length
+		self.algorithm = algorithm
+
+	@property
+	def row_bytes(self):
+		return (self.width + 7) // 8
+
+	@property
+	def grid_offset(self):
+		return HEADER_SIZE
+
+	@property
+	def path_offset(self):
+		return HEADER_SIZE + self.row_bytes * self.height
+
+	def pack(self):
+		data = HEADER.pack(MAGIC, VERSION, 0, self.width, self.height, self.round_walk, self.seed,
+			self.start[0], self.start[1], self.goal[0], self.goal[1], self.path_length,
+			self.algorithm.encode("ascii")[:16])
+		return data.ljust(HEADER_SIZE, b"\0")
+
+	@classmethod
+	def unpack(cls, data):
+		magic, version, _, width, height, round_walk, seed, start_row, start_col, goal_row, goal_col, path_length, algorithm = \
+			HEADER.unpack_from(data)
+		if magic != MAGIC or version != VERSION:
+			raise ValueError("Not a maze file (version {})".format(VERSION))
+		return cls(width, height, round_walk, seed, (start_row, start_col), (goal_row, goal_col), path_length,
+			algorithm.rstrip(b"\0").decode("ascii"))
+
+
+def encode_path(cells):
+	"""
+	Packs a path given as a list of adjacent (row, col) cells into 2-bit moves.
+	"""
+	codes = np.array([MOVES.index((b[0] - a[0], b[1] - a[1])) for a, b in zip(cells, cells[1:])], dtype=np.uint8)
+	padded = np.zeros((len(codes) + 3) // 4 * 4, dtype=np.uint8)
+	padded[:len(codes)] = codes
+	quads = padded.reshape(-1, 4)
+	return (quads[:, 0] << 6 | quads[:, 1] << 4 | quads[:, 2] << 2 | quads[:, 3]).astype(np.uint8).tobytes()
+
+
+def decode_path(start, data, length):
+	"""
+	Unpacks length 2-bit moves from data and returns the path cells from start, including both ends.
+	"""
+	packed = np.frombuffer(data, dtype=np.uint8)
+	codes = np.stack([packed >> 6, packed >> 4 & 3, packed >> 2 & 3, packed & 3], axis=1).reshape(-1)[:length]
+	row, col = start
+	cells = [(row, col)]
+	for code in codes.tolist():
+		d_row, d_col = MOVES[code]
+		row += d_row
+		col += d_col
+		cells.append((row, col))
+	return cells
+
+
+def _default_file_mode():
+	# The mode open() gives new files (0o666 less the umask). Read once at import, while only the main
+	# thread runs: os.umask can only be read by setting it.
+	umask = os.umask(0o022)
+	os.umask(umask)
+	return 0o666 & ~umask
+
+
+# tempfile.mkstemp creates files only their owner can read; written files get this mode instead.
+FILE_MODE = _default_file_mode()
+
+
+def write_maze(file_path, grid, header, path_cells=()):
+	"""
+	Writes grid (a MazeGrid), its header and the best path (list of (row, col) from start to goal) to file_path.
+	The file is written to a temporary file of its own first and renamed, so readers never see a partial
+	file, even when two threads or processes write the same maze at once.
+	"""
+	path_cells = list(path_cells)
+	header.width = grid.width
+	header.height = grid.height
+	header.path_length = max(len(path_cells) - 1, 0)
+	descriptor, temporary = tempfile.mkstemp(suffix=".tmp", prefix=os.path.basename(file_path) + ".", dir=os.path.dirname(file_path) or ".")
+	try:
+		with os.fdopen(descriptor, "wb") as file:
+			file.write(header.pack())
+			file.write(np.packbits(grid.array.astype(bool), axis=1).tobytes())
+			if path_cells:
+				file.write(encode_path(path_cells))
+		os.chmod(temporary, FILE_MODE)
+		os.replace(temporary, file_path)
+	except BaseException:
+		os.remove(temporary)
+		raise
+
+
+def read_maze(file_path):
+	"""
+	Reads a maze file into memory.
+	Returns (grid, header, path_cells) with grid a MazeGrid and path_cells the best path from start to goal.
+	"""
+	with open(file_path, "rb") as file:
+		data = file.read()
+	header = MazeHeader.unpack(data)
+	bits = np.frombuffer(data, dtype=np.uint8, count=header.row_bytes * header.height, offset=header.grid_offset)
+	grid = MazeGrid(header.width, header.height)
+	grid.array[:] = np.unpackbits(bits.reshape(header.height, header.row_bytes), axis=1, count=header.width)
+	path_cells = decode_path(header.start, data[header.path_offset:], header.path_length) if header.path_length else [header.start]
+	return grid, header, path_cells
+
+
+class _BitRow:
+	def __init__(self, grid, row):
+		self._grid = grid
+		self._row = row
+
+	def __getitem__(self, col):
+		return self._grid.is_free(self._row, col)
+
+	def __len__(self):
+		return self._grid.width
+
+
+class MappedMazeGrid:
+	def __init__(self, file_path):
+		"""
+		A read-only maze backed by a memory-mapped maze file. Nothing is copied or unpacked on load:
+		cells are read from the mapped bits on demand and the pages are shared by every process that
+		maps the same file. Implements the MazeGrid interface (width, height, is_free, in_bounds,
+		grid[row][col]), plus window() for vectorized consumers.
+		"""
+		self._file = open(file_path, "rb")
+		self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+		self.header = MazeHeader.unpack(self._map)
+		self.width = self.header.width
+		self.height = self.header.height
+		self._row_bytes = self.header.row_bytes
+		self._offset = self.header.grid_offset
+		# (height, row_bytes) view of the packed bits; no copy.
+		self.bits = np.frombuffer(self._map, dtype=np.uint8, count=self._row_bytes * self.height,
+			offset=self._offset).reshape(self.height, self._row_bytes)
+
+	def is_free(self, row, col):
+		return (self._map[self._offset + row * self._row_bytes + (col >> 3)] >> (7 - (col & 7))) & 1 != 0
+
+	def in_bounds(self, row, col):
+		return 0 <= row < self.height and 0 <= col < self.width
+
+	def window(self, top, rows):
+		"""
+		Returns grid rows top .. top + rows - 1 (clipped to the maze) unpacked as a (rows, width) uint8 array.
+		"""
+		top = max(top, 0)
+		return np.unpackbits(self.bits[top:top + rows], axis=1, count=self.width)
+
+	def path_cells(self):
+		# The best path stored in the file, from start to goal.
+		if not self.header.path_length:
+			return [self.header.start]
+		return decode_path(self.header.start, self._map[self.header.path_offset:], self.header.path_length)
+
+	def __getitem__(self, row):
+		if row < 0:
+			row += self.height
+		return _BitRow(self, row)
+
+	def __len__(self):
+		return self.height
+
+	def close(self):
+		# The bits view must go before the map can be closed.
+		self.bits = None
+		self._map.close()
+		self._file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+
+def open_maze(file_path):
+	"""
+	Memory-maps a maze file. Returns a MappedMazeGrid; its header holds the seed, start and goal.
+	"""
+	return MappedMazeGrid(file_path)
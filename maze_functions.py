@@ -1,25 +1,26 @@
 import random
 import pygame
+from maze_grid import MazeGrid
 
 
 def generate_maze(width, height, round_walk: 20):
 	"""
 	Generates a maze in-place on the given grid using DFS-based recursive backtracking.
 
-	The grid is assumed to be a 2D list of booleans with all cells initially True (empty).
-	After running this function, passages are marked as True and walls as False.
+	Returns a MazeGrid in which passages are marked as free (1) and walls as 0.
 
 	Note: For a proper maze, grid dimensions should be odd numbers.
 	"""
 
-	grid = [[False] * width for _ in range(height)]
+	grid = MazeGrid(width, height)
+	cells = grid.cells
 	# for i in range(1, height - 1):
 	# 	for j in range(1, width - 1):
 	# 		grid[i][j] = True
 	# return grid
 	# Choose a starting cell; typically (1,1) works for grids at least 3x3.
 	start_i, start_j = 1, 1
-	grid[start_i][start_j] = True
+	cells[start_i * width + start_j] = 1
 
 	# Use a stack for DFS: each element is a tuple (i, j)
 	stack = [(start_i, start_j)]
@@ -37,7 +38,7 @@ def generate_maze(width, height, round_walk: 20):
 			ni, nj = current_i + di, current_j + dj
 			# Ensure neighbor is within bounds and not yet carved (still a wall)
 			if 0 <= ni < height - 1 and 0 <= nj < width - 1 and (
-					grid[ni][nj] == False or not random.randint(0, round_walk)):
+					not cells[ni * width + nj] or not random.randint(0, round_walk)):
 				neighbors.append((di, dj))
 
 		if neighbors:
@@ -49,10 +50,10 @@ def generate_maze(width, height, round_walk: 20):
 			# The cell in between is at (current_i + di//2, current_j + dj//2).
 			wall_i = current_i + di // 2
 			wall_j = current_j + dj // 2
-			grid[wall_i][wall_j] = True
+			cells[wall_i * width + wall_j] = 1
 
 			# Mark the neighbor as a passage.
-			grid[ni][nj] = True
+			cells[ni * width + nj] = 1
 
 			# Move to the neighbor cell.
 			stack.append((ni, nj))
@@ -60,18 +61,16 @@ def generate_maze(width, height, round_walk: 20):
 			# Backtrack if there are no unvisited neighbors.
 			stack.pop()
 
-	grid[0] = [False] * width
-	grid[height - 1] = [False] * height
-	for i in range(width):
-		grid[i][height - 1] = False
-		grid[i][0] = False
+	# Close the outer border.
+	grid.array[0, :] = 0
+	grid.array[height - 1, :] = 0
+	grid.array[:, 0] = 0
+	grid.array[:, width - 1] = 0
 	return grid
 
 
-from collections import deque
-
-from collections import deque
 import pygame
+from maze_solver import distance_field
 
 
 def bfs_furthest(x, y, grid, path_color=(0,0,0)):
@@ -82,8 +81,7 @@ def bfs_furthest(x, y, grid, path_color=(0,0,0)):
 	Parameters:
 		x (int): The starting row index.
 		y (int): The starting column index.
-		grid (list[list[bool]]): A 2D grid where accessible cells are True and walls are False.
-			(Note: Updated grid definition to match the code logic.)
+		grid (MazeGrid | list[list[bool]]): A grid where accessible cells are True and walls are False.
 
 	Returns:
 		tuple: A tuple (furthest_cell, path) where:
@@ -92,53 +90,15 @@ def bfs_furthest(x, y, grid, path_color=(0,0,0)):
 			  to the furthest cell (including both endpoints).
 		Returns None if the starting cell is not accessible.
 	"""
-	# Check if the starting cell is accessible (True). If not, return None.
-	if not grid[x][y]:
+	# The search itself runs on flat arrays; see maze_solver.distance_field.
+	field = distance_field(grid, x, y)
+	if field is None:
 		return None
 
-	visited = set()
-	visited.add((x, y))
-
-	# Dictionary for path reconstruction: maps each cell to its predecessor.
-	prev = {}
-	prev[(x, y)] = None
-
-	# Initialize the queue with (row, column, distance)
-	q = deque()
-	q.append((x, y, 0))
-
-	# Track the furthest cell and its distance
-	furthest_cell = (x, y)
-	max_distance = 0
-
-	# Define movements: up, down, left, right.
-	directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-
-	while q:
-		cx, cy, dist = q.popleft()
-
-		# Update furthest cell if a larger distance is found.
-		if dist > max_distance:
-			max_distance = dist
-			furthest_cell = (cx, cy)
-
-		# Explore all four neighbors.
-		for dx, dy in directions:
-			nx, ny = cx + dx, cy + dy
-			# Check if within grid bounds.
-			if 0 <= nx < len(grid) and 0 <= ny < len(grid[0]):
-				# Continue only if the cell is accessible and not visited.
-				if (nx, ny) not in visited and grid[nx][ny]:
-					visited.add((nx, ny))
-					prev[(nx, ny)] = (cx, cy)
-					q.append((nx, ny, dist + 1))
-
 	# Reconstruct the shortest path from (x, y) to the furthest cell.
 	path = {}
-	cell = furthest_cell
-	while cell is not None:
+	for cell in reversed(field.path_to(*field.furthest)):
 		path[cell] = path_color
-		cell = prev[cell]
-	# path.reverse()
+	furthest_cell = field.furthest
 
 	return pygame.math.Vector2(furthest_cell[0], furthest_cell[1]), path
@@ -0,0 +1,273 @@
+"""
+Maze generation engine with pluggable algorithms.
+
+Every algorithm works on the "cell graph" of the maze: the cells at odd (row, col) grid positions,
+(height - 1) // 2 rows by (width - 1) // 2 columns of them. An algorithm returns two boolean arrays:
+	- horizontal[r, c]: the wall between cell (r, c) and cell (r, c + 1) is open.
+	- vertical[r, c]: the wall between cell (r, c) and cell (r + 1, c) is open.
+These are turned into a MazeGrid with array slicing, so the grid layout matches
+maze_functions.generate_maze (free cell (1, 1), closed outer border).
+
+All randomness comes from a seeded numpy.random.Generator and is drawn in bulk.
+"""
+import numpy as np
+from maze_grid import MazeGrid
+
+RANDOM_BLOCK = 1 << 16
+
+
+def _loop_probability(round_walk):
+	"""
+	Chance that a remaining inner wall is knocked out to create a loop. generate_maze re-enters carved
+	cells with chance 1 / (round_walk + 1) per step, which opens about 2 / (round_walk + 1) of the walls
+	a perfect maze would keep.
+	"""
+	if round_walk is None or round_walk < 0:
+		return 0.0
+	return min(1.0, 2.0 / (round_walk + 1))
+
+
+def _add_loops(horizontal, vertical, rng, round_walk):
+	probability = _loop_probability(round_walk)
+	if probability <= 0:
+		return
+	horizontal |= rng.random(horizontal.shape) < probability
+	vertical |= rng.random(vertical.shape) < probability
+
+
+def _assemble(width, height, horizontal, vertical):
+	# Builds the MazeGrid for the given cell-graph openings.
+	rows, cols = horizontal.shape[0], vertical.shape[1]
+	grid = MazeGrid(width, height)
+	cells = grid.array
+	cells[1:2 * rows:2, 1:2 * cols:2] = 1
+	cells[1:2 * rows:2, 2:2 * cols - 1:2] = horizontal[:, :cols - 1]
+	cells[2:2 * rows - 1:2, 1:2 * cols:2] = vertical[:rows - 1, :]
+	return grid
+
+
+def _empty_openings(rows, cols):
+	return np.zeros((rows, max(cols - 1, 0)), dtype=bool), np.zeros((max(rows - 1, 0), cols), dtype=bool)
+
+
+def backtracker(rows, cols, rng):
+	"""
+	Iterative recursive backtracker (DFS) on flat arrays.
+	Cells are indexed as r * cols + c; the stack holds indices and random choices come from pre-drawn blocks.
+	"""
+	horizontal, vertical = _empty_openings(rows, cols)
+	count = rows * cols
+	visited = bytearray(count)
+	visited[0] = 1
+	stack = [0]
+	randoms = rng.random(RANDOM_BLOCK).tolist()
+	used = 0
+	while stack:
+		index = stack[-1]
+		r, c = divmod(index, cols)
+		options = []
+		if r > 0 and not visited[index - cols]:
+			options.append(index - cols)
+		if r < rows - 1 and not visited[index + cols]:
+			options.append(index + cols)
+		if c > 0 and not visited[index - 1]:
+			options.append(index - 1)
+		if c < cols - 1 and not visited[index + 1]:
+			options.append(index + 1)
+		if not options:
+			stack.pop()
+			continue
+		if used == RANDOM_BLOCK:
+			randoms = rng.random(RANDOM_BLOCK).tolist()
+			used = 0
+		chosen = options[int(randoms[used] * len(options))]
+		used += 1
+		if chosen == index + 1:
+			horizontal[r, c] = True
+		elif chosen == index - 1:
+			horizontal[r, c - 1] = True
+		elif chosen == index + cols:
+			vertical[r, c] = True
+		else:
+			vertical[r - 1, c] = True
+		visited[chosen] = 1
+		stack.append(chosen)
+	return horizontal, vertical
+
+
+def wilson(rows, cols, rng):
+	"""
+	Wilson's algorithm: loop-erased random walks from unvisited cells until they hit the maze.
+	Produces a uniform spanning tree. Loop erasure is implicit: each cell remembers the direction it was
+	last left in, so revisiting a cell simply overwrites it.
+	"""
+	horizontal, vertical = _empty_openings(rows, cols)
+	count = rows * cols
+	in_maze = bytearray(count)
+	in_maze[int(rng.integers(count))] = 1
+	exits = [0] * count
+	# Offsets and opening updates for the directions up, down, left, right.
+	offsets = (-cols, cols, -1, 1)
+	steps = rng.integers(0, 4, RANDOM_BLOCK).tolist()
+	used = 0
+	remaining = count - 1
+	for start in rng.permutation(count).tolist():
+		if in_maze[start]:
+			continue
+		# Random walk until the maze is reached.
+		index = start
+		while not in_maze[index]:
+			r, c = divmod(index, cols)
+			while True:
+				if used == RANDOM_BLOCK:
+					steps = rng.integers(0, 4, RANDOM_BLOCK).tolist()
+					used = 0
+				direction = steps[used]
+				used += 1
+				if (direction == 0 and r > 0) or (direction == 1 and r < rows - 1) or \
+						(direction == 2 and c > 0) or (direction == 3 and c < cols - 1):
+					break
+			exits[index] = direction
+			index += offsets[direction]
+		# Carve the loop-erased walk into the maze.
+		index = start
+		while not in_maze[index]:
+			in_maze[index] = 1
+			remaining -= 1
+			r, c = divmod(index, cols)
+			direction = exits[index]
+			if direction == 0:
+				vertical[r - 1, c] = True
+			elif direction == 1:
+				vertical[r, c] = True
+			elif direction == 2:
+				horizontal[r, c - 1] = True
+			else:
+				horizontal[r, c] = True
+			index += offsets[direction]
+		if not remaining:
+			break
+	return horizontal, vertical
+
+
+def eller_row(labels, rng, next_label, last=False):
+	"""
+	Carves one row of Eller's algorithm.
+	- labels: int array with the set of every cell in the current row.
+	- rng: numpy.random.Generator.
+	- next_label: First unused set label.
+	- last: True for the final row, which joins all remaining sets.
+	Returns (horizontal, vertical, next_labels, next_label): the openings inside the row, the openings
+	down to the next row, the labels of the next row and the new first unused label.
+	"""
+	cols = labels.shape[0]
+	horizontal = np.zeros(max(cols - 1, 0), dtype=bool)
+	joins = (rng.random(max(cols - 1, 0)) < 0.5).tolist()
+	# Sets are merged with a small union-find over the labels of this row.
+	parent = {}
+
+	def find(label):
+		while label in parent:
+			label = parent[label]
+		return label
+
+	row = labels.tolist()
+	for c in range(cols - 1):
+		if last or joins[c]:
+			a = find(row[c])
+			b = find(row[c + 1])
+			if a != b:
+				horizontal[c] = True
+				parent[b] = a
+	if parent:
+		labels = np.array([find(label) for label in row], dtype=labels.dtype)
+	if last:
+		return horizontal, np.zeros(cols, dtype=bool), labels, next_label
+
+	# Each set keeps at least one connection down; the others are random.
+	vertical = rng.random(cols) < 0.5
+	order = rng.permutation(cols)
+	_, first = np.unique(labels[order], return_index=True)
+	vertical[order[first]] = True
+
+	next_labels = np.where(vertical, labels, 0)
+	fresh = np.flatnonzero(~vertical)
+	next_labels[fresh] = np.arange(next_label, next_label + fresh.size)
+	return horizontal, vertical, next_labels, next_label + fresh.size
+
+
+def eller(rows, cols, rng):
+	"""
+	Eller's algorithm: builds the maze one row at a time, only keeping the set labels of the current row.
+	"""
+	horizontal, vertical = _empty_openings(rows, cols)
+	labels = np.arange(cols)
+	next_label = cols
+	for r in range(rows):
+		row_horizontal, row_vertical, labels, next_label = eller_row(labels, rng, next_label, last=r == rows - 1)
+		horizontal[r] = row_horizontal
+		if r < rows - 1:
+			vertical[r] = row_vertical
+	return horizontal, vertical
+
+
+def kruskal(rows, cols, rng):
+	"""
+	Randomized Kruskal's algorithm: visits all inner walls in random order and opens a wall whenever
+	the cells on both sides are not yet connected (tracked with a union-find with path halving).
+	"""
+	horizontal, vertical = _empty_openings(rows, cols)
+	parent = list(range(rows * cols))
+	horizontal_count = rows * (cols - 1)
+	wall_count = horizontal_count + (rows - 1) * cols
+	opened = bytearray(wall_count)
+	for wall in rng.permutation(wall_count).tolist():
+		if wall < horizontal_count:
+			r, c = divmod(wall, cols - 1)
+			a = r * cols + c
+			b = a + 1
+		else:
+			r, c = divmod(wall - horizontal_count, cols)
+			a = r * cols + c
+			b = a + cols
+		while parent[a] != a:
+			parent[a] = parent[parent[a]]
+			a = parent[a]
+		while parent[b] != b:
+			parent[b] = parent[parent[b]]
+			b = parent[b]
+		if a != b:
+			parent[b] = a
+			opened[wall] = 1
+	opened = np.frombuffer(bytes(opened), dtype=np.uint8).astype(bool)
+	horizontal[:] = opened[:horizontal_count].reshape(rows, cols - 1)
+	vertical[:] = opened[horizontal_count:].reshape(rows - 1, cols)
+	return horizontal, vertical
+
+
+ALGORITHMS = {
+	"backtracker": backtracker,
+	"wilson": wilson,
+	"eller": eller,
+	"kruskal": kruskal,
+}
+
+
+def generate(width, height, round_walk=20, algorithm="backtracker", seed=None):
+	"""
+	Generates a maze with the given algorithm.
+	- width, height: Grid size in cells (odd numbers give a proper maze).
+	- round_walk: Controls loops like in maze_functions.generate_maze; higher means fewer loops,
+	  None or a negative value gives a perfect maze.
+	- algorithm: A key of ALGORITHMS.
+	- seed: Seed for numpy.random.default_rng; the same seed always gives the same maze.
+	Returns a MazeGrid.
+	"""
+	if algorithm not in ALGORITHMS:
+		raise ValueError("Unknown maze algorithm: {}".format(algorithm))
+	rng = np.random.default_rng(seed)
+	rows = max((height - 1) // 2, 1)
+	cols = max((width - 1) // 2, 1)
+	horizontal, vertical = ALGORITHMS[algorithm](rows, cols, rng)
+	_add_loops(horizontal, vertical, rng, round_walk)
+	return _assemble(width, height, horizontal, vertical)
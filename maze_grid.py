@@ -0,0 +1,76 @@
+import numpy as np
+
+
+class MazeGrid:
+	def __init__(self, width, height, cells=None):
+		"""
+		A maze grid stored as one contiguous row-major uint8 buffer (1 = free, 0 = wall).
+		- width, height: Number of columns and rows.
+		- cells: Optional bytearray of width * height bytes to wrap (not copied).
+		The buffer is shared by three views:
+		- cells: the bytearray itself, for fast scalar access (cells[row * width + col]).
+		- array: a (height, width) NumPy view for vectorized consumers.
+		- grid[row][col]: row views, so code written for list-of-lists grids keeps working.
+		"""
+		self.width = width
+		self.height = height
+		self.cells = cells if cells is not None else bytearray(width * height)
+		self.array = np.frombuffer(self.cells, dtype=np.uint8).reshape(height, width)
+		self._view = memoryview(self.cells)
+
+	@classmethod
+	def from_rows(cls, rows):
+		# Builds a MazeGrid from a list-of-lists grid of booleans.
+		height = len(rows)
+		width = len(rows[0]) if height else 0
+		grid = cls(width, height)
+		grid.array[:] = np.asarray(rows, dtype=bool)
+		return grid
+
+	def is_free(self, row, col):
+		return self.cells[row * self.width + col] != 0
+
+	def in_bounds(self, row, col):
+		return 0 <= row < self.height and 0 <= col < self.width
+
+	def __getitem__(self, row):
+		if row < 0:
+			row += self.height
+		start = row * self.width
+		return self._view[start:start + self.width]
+
+	def __len__(self):
+		return self.height
+
+	def __iter__(self):
+		for row in range(self.height):
+			yield self[row]
+
+	def tolist(self):
+		return self.array.astype(bool).tolist()
+
+	def __getstate__(self):
+		return self.width, self.height, bytes(self.cells)
+
+	def __setstate__(self, state):
+		width, height, cells = state
+		self.__init__(width, height, bytearray(cells))
+
+
+_last_rows = None
+_last_grid = None
+
+
+def as_maze_grid(grid):
+	"""
+	Returns grid as a MazeGrid. MazeGrids and other grids implementing its interface (width, height,
+	is_free, in_bounds, grid[row][col], such as endless_maze.ChunkedMazeGrid) are returned as is;
+	a list-of-lists grid is converted once and the conversion is reused for as long as the same list is passed in.
+	"""
+	global _last_rows, _last_grid
+	if hasattr(grid, "is_free"):
+		return grid
+	if grid is not _last_rows:
+		_last_grid = MazeGrid.from_rows(grid)
+		_last_rows = grid
+	return _last_grid
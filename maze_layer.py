@@ -0,0 +1,66 @@
+import numpy as np
+import pygame
+from maze_grid import as_maze_grid
+
+WALL_COLOR = (0, 0, 0)
+FREE_COLOR = (255, 255, 255)
+OUTLINE_COLOR = (128, 128, 128)
+START_COLOR = (255, 0, 0)
+GOAL_COLOR = (0, 255, 0)
+
+
+def render_maze(grid, cell_size, goal=None, start=None):
+	"""
+	Renders the whole maze once into a new Surface of grid.width * cell_size by grid.height * cell_size
+	pixels: free cells white, walls black, the start cell red, the goal cell green and a one pixel grey
+	outline around every cell (the same picture main.draw_grid used to draw rect by rect).
+	Cells smaller than 4 pixels get no outline, which would otherwise cover them entirely.
+	- goal: (row, col) of the goal cell, or None.
+	- start: (row, col) of the start cell, or None.
+	"""
+	grid = as_maze_grid(grid)
+	free = np.asarray(grid.array if hasattr(grid, "array") else grid.window(0, grid.height), dtype=bool)
+	colors = np.where(free[:, :, None], np.array(FREE_COLOR, dtype=np.uint8), np.array(WALL_COLOR, dtype=np.uint8))
+	if goal is not None:
+		colors[goal] = GOAL_COLOR
+	if start is not None:
+		colors[start] = START_COLOR
+	# Indexed [x, y] like pygame.surfarray.
+	pixels = colors.transpose(1, 0, 2).repeat(cell_size, axis=0).repeat(cell_size, axis=1)
+	if cell_size >= 4:
+		edge = np.arange(cell_size * max(grid.width, grid.height)) % cell_size
+		edge = (edge == 0) | (edge == cell_size - 1)
+		pixels[edge[:pixels.shape[0]], :] = OUTLINE_COLOR
+		pixels[:, edge[:pixels.shape[1]]] = OUTLINE_COLOR
+	surface = pygame.Surface(pixels.shape[:2])
+	pygame.surfarray.blit_array(surface, pixels)
+	if pygame.display.get_surface() is not None:
+		# Match the screen's pixel format so the per-frame blits need no conversion.
+		surface = surface.convert()
+	return surface
+
+
+class MazeLayer:
+	def __init__(self):
+		"""
+		The static picture of the current maze for the 2D view and the menus, rendered once per maze
+		(see render_maze) and blitted every frame instead of drawing two rects per cell.
+		"""
+		self.surface = None
+		self._key = None
+		self._grid = None
+
+	def draw(self, screen, grid, cell_size, goal=None, start=None, area=None):
+		"""
+		Blits the maze onto screen, rendering it first if the maze, cell size or markers changed.
+		- area: Optional pygame.Rect; only that part of the maze is copied.
+		"""
+		key = (id(grid), cell_size, goal, start)
+		if self.surface is None or key != self._key or self._grid is not grid:
+			self.surface = render_maze(grid, cell_size, goal, start)
+			self._key = key
+			self._grid = grid
+		if area is None:
+			screen.blit(self.surface, (0, 0))
+		else:
+			screen.blit(self.surface, area.topleft, area)
@@ -0,0 +1,134 @@
+from array import array
+import numpy as np
+from maze_grid import as_maze_grid
+
+# Frontiers at least this large are expanded with NumPy; smaller ones (the common case in
+# corridor-like mazes) with a plain loop, which has far less per-level overhead.
+VECTOR_FRONTIER = 256
+
+
+class DistanceField:
+	def __init__(self, width, height, source, dist, prev, furthest):
+		"""
+		Result of a breadth-first search over a maze.
+		- width, height: Size of the maze.
+		- source: (row, col) the search started from.
+		- dist: (height, width) int32 array with the number of steps from source, -1 where unreachable.
+		- prev: flat int32 array with the predecessor (row * width + col) of every reached cell, -1 for source.
+		- furthest: (row, col) of the first reached cell at the largest distance.
+		"""
+		self.width = width
+		self.height = height
+		self.source = source
+		self.dist = dist
+		self.prev = prev
+		self.furthest = furthest
+		self.max_distance = int(dist[furthest])
+
+	def distance(self, row, col):
+		# Steps from source to (row, col), or -1 if it cannot be reached.
+		return int(self.dist[row, col])
+
+	def path_to(self, row, col):
+		"""
+		Returns the shortest path from source to (row, col) as a list of (row, col), both ends included,
+		or an empty list if (row, col) cannot be reached.
+		"""
+		if self.dist[row, col] < 0:
+			return []
+		prev = self.prev
+		index = row * self.width + col
+		path = []
+		while index >= 0:
+			path.append(divmod(index, self.width))
+			index = int(prev[index])
+		path.reverse()
+		return path
+
+
+def _free_cells(grid):
+	# The cells of grid as flat bytes (1 = free).
+	if hasattr(grid, "cells"):
+		return grid.cells
+	if hasattr(grid, "array"):
+		return grid.array.tobytes()
+	return grid.window(0, grid.height).tobytes()
+
+
+def distance_field(grid, row, col):
+	"""
+	Breadth-first search from (row, col) over flat arrays instead of tuple sets and dicts.
+	Cells are expanded level by level in the same order as maze_functions.bfs_furthest (up, down,
+	left, right), so the distances, predecessors and furthest cell match it exactly.
+	Returns a DistanceField, or None if the starting cell is a wall.
+	"""
+	grid = as_maze_grid(grid)
+	width, height = grid.width, grid.height
+	count = width * height
+	free = _free_cells(grid)
+	start = row * width + col
+	if not free[start]:
+		return None
+
+	dist = array('i', [-1]) * count
+	prev = array('i', [-1]) * count
+	dist_view = np.frombuffer(dist, dtype=np.int32)
+	prev_view = np.frombuffer(prev, dtype=np.int32)
+	free_view = np.frombuffer(free, dtype=np.uint8)
+	offsets = np.array([-width, width, -1, 1])
+
+	dist[start] = 0
+	frontier = [start]
+	last_frontier = frontier
+	level = 0
+	while frontier:
+		last_frontier = frontier
+		level += 1
+		if len(frontier) < VECTOR_FRONTIER:
+			following = []
+			for cell in frontier:
+				cell_col = cell % width
+				neighbor = cell - width
+				if neighbor >= 0 and free[neighbor] and dist[neighbor] < 0:
+					dist[neighbor] = level
+					prev[neighbor] = cell
+					following.append(neighbor)
+				neighbor = cell + width
+				if neighbor < count and free[neighbor] and dist[neighbor] < 0:
+					dist[neighbor] = level
+					prev[neighbor] = cell
+					following.append(neighbor)
+				neighbor = cell - 1
+				if cell_col > 0 and free[neighbor] and dist[neighbor] < 0:
+					dist[neighbor] = level
+					prev[neighbor] = cell
+					following.append(neighbor)
+				neighbor = cell + 1
+				if cell_col < width - 1 and free[neighbor] and dist[neighbor] < 0:
+					dist[neighbor] = level
+					prev[neighbor] = cell
+					following.append(neighbor)
+			frontier = following
+		else:
+			cells = np.asarray(frontier)
+			candidates = (cells[:, None] + offsets[None, :]).ravel()
+			parents = np.repeat(cells, 4)
+			cell_cols = np.repeat(cells % width, 4)
+			direction = np.tile(np.arange(4), cells.size)
+			valid = (candidates >= 0) & (candidates < count)
+			valid &= ~((direction == 2) & (cell_cols == 0)) & ~((direction == 3) & (cell_cols == width - 1))
+			candidates = candidates[valid]
+			parents = parents[valid]
+			keep = (free_view[candidates] != 0) & (dist_view[candidates] < 0)
+			candidates = candidates[keep]
+			parents = parents[keep]
+			# Keep the first discovery of every cell, in discovery order.
+			_, first = np.unique(candidates, return_index=True)
+			first.sort()
+			following = candidates[first]
+			dist_view[following] = level
+			prev_view[following] = parents[first]
+			frontier = following.tolist()
+
+	furthest = divmod(last_frontier[0], width)
+	return DistanceField(width, height, (row, col), dist_view.reshape(height, width), prev_view, furthest)
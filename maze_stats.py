@@ -0,0 +1,181 @@
+"""
+Offline maze statistics for level curation.
+
+Generates mazes for every combination of grid size, round_walk, algorithm and seed on a process pool,
+measures each one (see maze_metrics) and streams one CSV row per maze to the output file as results
+come in. An interrupted run picks up where it stopped: mazes already in the output file are skipped
+and a partly written last row is dropped.
+
+Usage: python maze_stats.py --output corpus.csv [--sizes 13 21 31] [--round-walks 5 15 50 -1]
+	[--algorithms backtracker wilson] [--seeds 1000] [--first-seed 0] [--workers 4]
+
+The start and goal of every maze are picked as in the game: the first free cell in row-major order and
+the cell furthest from it (maze_functions.bfs_furthest). A round_walk of -1 gives perfect mazes.
+"""
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+from maze_generators import ALGORITHMS, generate
+from maze_solver import distance_field
+
+KEY_COLUMNS = ["size", "round_walk", "algorithm", "seed"]
+METRIC_COLUMNS = ["free_cells", "dead_ends", "junctions", "branching_factor", "loops", "solution_length",
+	"solution_turns", "solution_junctions", "tortuosity", "generate_ms", "analyze_ms"]
+COLUMNS = KEY_COLUMNS + METRIC_COLUMNS
+# Mazes per task sent to a worker process; big enough to amortize the pickling round trip.
+CHUNK_SIZE = 64
+
+
+def maze_metrics(grid):
+	"""
+	Measures a maze (a MazeGrid). Cells are connected to their free up/down/left/right neighbours.
+	Returns a dict with:
+	- free_cells: Number of free cells.
+	- dead_ends: Free cells with a single free neighbour.
+	- junctions: Free cells with three or more free neighbours.
+	- branching_factor: Mean number of ways out of a junction (0 without junctions).
+	- loops: Independent cycles of the part of the maze reachable from the start (edges - cells + 1).
+	- solution_length: Steps from the start to the goal (the furthest cell from the start).
+	- solution_turns: Changes of direction along the shortest path from start to goal.
+	- solution_junctions: Junctions on that path, i.e. the choices a player has to get right.
+	- tortuosity: solution_length divided by the Manhattan distance from start to goal.
+	"""
+	free = grid.array != 0
+	padded = np.pad(free, 1)
+	degree = (padded[:-2, 1:-1].astype(np.int8) + padded[2:, 1:-1] + padded[1:-1, :-2] + padded[1:-1, 2:]) * free
+	metrics = {"free_cells": int(free.sum()), "dead_ends": int((degree == 1).sum()), "junctions": int((degree >= 3).sum())}
+	metrics["branching_factor"] = float(degree[degree >= 3].mean()) if metrics["junctions"] else 0.0
+
+	start = divmod(int(np.argmax(grid.array.ravel() != 0)), grid.width)
+	from_start = distance_field(grid, *start) if metrics["free_cells"] else None
+	if from_start is None:
+		metrics.update(loops=0, solution_length=0, solution_turns=0, solution_junctions=0, tortuosity=0.0)
+		return metrics
+
+	reached = from_start.dist >= 0
+	edges = int((reached[:, :-1] & reached[:, 1:]).sum() + (reached[:-1, :] & reached[1:, :]).sum())
+	metrics["loops"] = edges - int(reached.sum()) + 1
+
+	path = np.array(from_start.path_to(*from_start.furthest))
+	steps = np.diff(path, axis=0)
+	metrics["solution_length"] = len(path) - 1
+	metrics["solution_turns"] = int(np.any(steps[1:] != steps[:-1], axis=1).sum()) if len(steps) > 1 else 0
+	# The goal itself is no choice; the start is one if it has several ways out.
+	metrics["solution_junctions"] = int((degree[path[:-1, 0], path[:-1, 1]] >= 3).sum())
+	manhattan = int(np.abs(path[-1] - path[0]).sum())
+	metrics["tortuosity"] = metrics["solution_length"] / manhattan if manhattan else 0.0
+	return metrics
+
+
+def measure(job):
+	"""
+	Generates and measures the maze of job = (size, round_walk, algorithm, seed); returns its CSV row.
+	"""
+	size, round_walk, algorithm, seed = job
+	start = time.perf_counter()
+	grid = generate(size, size, round_walk, algorithm, seed=seed)
+	generated = time.perf_counter()
+	metrics = maze_metrics(grid)
+	metrics["generate_ms"] = (generated - start) * 1000
+	metrics["analyze_ms"] = (time.perf_counter() - generated) * 1000
+	return [size, round_walk, algorithm, seed] + [metrics[name] for name in METRIC_COLUMNS]
+
+
+def measure_chunk(jobs):
+	return [measure(job) for job in jobs]
+
+
+def _row_key(row):
+	return int(row[0]), int(row[1]), row[2], int(row[3])
+
+
+def finished_jobs(file_path):
+	"""
+	Returns the keys (size, round_walk, algorithm, seed) of the mazes already in the CSV file at
+	file_path, after cutting off a last row that was only partly written. An empty set if the file
+	does not exist; ValueError if it is not a file of this tool.
+	"""
+	if not os.path.exists(file_path):
+		return set()
+	with open(file_path, "rb+") as file:
+		data = file.read()
+		complete = data.rfind(b"\n") + 1
+		if complete < len(data):
+			file.truncate(complete)
+	lines = data[:complete].decode("utf-8").splitlines()
+	if not lines:
+		return set()
+	reader = csv.reader(lines)
+	if next(reader) != COLUMNS:
+		raise ValueError("{} has other columns than {}".format(file_path, ", ".join(COLUMNS)))
+	return {_row_key(row) for row in reader}
+
+
+def run(jobs, file_path, workers=None, progress=None):
+	"""
+	Measures the mazes of jobs that are not in the CSV file at file_path yet and appends their rows as
+	they complete (in completion order). At most a few chunks per worker are in flight, so the job list
+	can be a generator over a very large corpus.
+	- progress: Optional function called with the number of rows written so far.
+	Returns the number of rows written.
+	"""
+	done = finished_jobs(file_path)
+	pending = (job for job in jobs if job not in done)
+	workers = workers or os.cpu_count() or 1
+	written = 0
+	with open(file_path, "a", newline="") as file, ProcessPoolExecutor(workers) as pool:
+		writer = csv.writer(file)
+		if file.tell() == 0:
+			writer.writerow(COLUMNS)
+		in_flight = set()
+		while True:
+			while len(in_flight) < workers * 2:
+				chunk = list(itertools.islice(pending, CHUNK_SIZE))
+				if not chunk:
+					break
+				in_flight.add(pool.submit(measure_chunk, chunk))
+			if not in_flight:
+				break
+			finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+			for future in finished:
+				rows = future.result()
+				writer.writerows(rows)
+				written += len(rows)
+			# Rows on disk survive an interruption; see finished_jobs.
+			file.flush()
+			if progress is not None:
+				progress(written)
+	return written
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Generate mazes and write their statistics to a CSV file.")
+	parser.add_argument("--output", required=True, help="CSV file; an existing one is resumed")
+	parser.add_argument("--sizes", type=int, nargs="+", default=[13, 21, 31])
+	parser.add_argument("--round-walks", type=int, nargs="+", default=[5, 15, 50, -1])
+	parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS), choices=list(ALGORITHMS))
+	parser.add_argument("--seeds", type=int, default=1000, help="mazes per size, round_walk and algorithm")
+	parser.add_argument("--first-seed", type=int, default=0)
+	parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+	args = parser.parse_args()
+
+	jobs = itertools.product(args.sizes, args.round_walks, args.algorithms, range(args.first_seed, args.first_seed + args.seeds))
+	start = time.perf_counter()
+
+	def progress(written):
+		sys.stderr.write("\r{} mazes measured ({:.0f}/s)".format(written, written / max(time.perf_counter() - start, 1e-9)))
+
+	try:
+		written = run(jobs, args.output, args.workers, progress)
+	except ValueError as error:
+		sys.exit(str(error))
+	sys.stderr.write("\n{} new mazes written to {}\n".format(written, args.output))
+
+
+if __name__ == '__main__':
+	main()
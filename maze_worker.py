@@ -0,0 +1,76 @@
+import queue
+import threading
+
+
+class MazePrefetcher:
+	def __init__(self, prepare, depth=1):
+		"""
+		Generates and solves mazes on a background thread so the main loop never waits for them.
+		- prepare: Function called as prepare(*key) that builds a ready-to-play maze.
+		- depth: Number of prepared mazes to keep ready per key.
+		Keys are the argument tuples for prepare, e.g. (grid_size, algorithm). The main loop tells the
+		prefetcher which keys it may need soon with want() and picks finished mazes up with take().
+		"""
+		self._prepare = prepare
+		self._depth = depth
+		self._wanted = []
+		self._ready = {}
+		self._lock = threading.Lock()
+		self._wake = threading.Event()
+		self._running = True
+		self._thread = threading.Thread(target=self._run, name="maze-prefetcher", daemon=True)
+		self._thread.start()
+
+	def want(self, keys):
+		"""
+		Sets the keys to keep mazes ready for, most important first. Mazes already prepared for
+		keys that are no longer wanted are dropped.
+		"""
+		keys = list(dict.fromkeys(keys))
+		with self._lock:
+			self._wanted = keys
+			for key in list(self._ready):
+				if key not in keys:
+					del self._ready[key]
+			for key in keys:
+				self._ready.setdefault(key, queue.Queue(maxsize=self._depth))
+		self._wake.set()
+
+	def take(self, key):
+		"""
+		Returns a prepared maze for key, or None if none is ready yet.
+		"""
+		with self._lock:
+			ready = self._ready.get(key)
+		if ready is None:
+			return None
+		try:
+			maze = ready.get_nowait()
+		except queue.Empty:
+			return None
+		self._wake.set()
+		return maze
+
+	def stop(self):
+		self._running = False
+		self._wake.set()
+
+	def _next_key(self):
+		with self._lock:
+			for key in self._wanted:
+				if not self._ready[key].full():
+					return key, self._ready[key]
+		return None, None
+
+	def _run(self):
+		while self._running:
+			key, ready = self._next_key()
+			if key is None:
+				self._wake.wait()
+				self._wake.clear()
+				continue
+			maze = self._prepare(*key)
+			try:
+				ready.put_nowait(maze)
+			except queue.Full:
+				pass
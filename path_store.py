@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class PathStore(dict):
+	def __init__(self, rows, cols, cells=None):
+		"""
+		A path dictionary ({(row, col): (r, g, b)}) that also keeps a spatial index of its cells,
+		so renderers can look up only the cells they need instead of scanning every entry.
+		- rows, cols: Size of the maze grid.
+		- cells: Optional initial {(row, col): color} entries.
+		The index consists of:
+		- mask / colors: grid-aligned occupancy and color arrays (the PathBitmap interface of floor_caster).
+		- row_buckets: {row: {col: color}} for the cells of each row.
+		"""
+		super().__init__()
+		self.rows = rows
+		self.cols = cols
+		self.mask = np.zeros((rows, cols), dtype=bool)
+		self.colors = np.zeros((rows, cols, 3), dtype=np.uint8)
+		self.row_buckets = {}
+		if cells:
+			self.update(cells)
+
+	def __setitem__(self, cell, color):
+		super().__setitem__(cell, color)
+		row, col = cell
+		self.row_buckets.setdefault(row, {})[col] = color
+		if 0 <= row < self.rows and 0 <= col < self.cols:
+			self.mask[row, col] = True
+			self.colors[row, col] = color
+
+	def __delitem__(self, cell):
+		super().__delitem__(cell)
+		row, col = cell
+		bucket = self.row_buckets[row]
+		del bucket[col]
+		if not bucket:
+			del self.row_buckets[row]
+		if 0 <= row < self.rows and 0 <= col < self.cols:
+			self.mask[row, col] = False
+
+	def update(self, cells=()):
+		for cell, color in dict(cells).items():
+			self[cell] = color
+
+	# The other dict methods that add or remove entries go through __setitem__ / __delitem__ too,
+	# so the index never goes stale.
+	def __ior__(self, cells):
+		self.update(cells)
+		return self
+
+	def setdefault(self, cell, color=None):
+		if cell not in self:
+			self[cell] = color
+		return self[cell]
+
+	_missing = object()
+
+	def pop(self, cell, default=_missing):
+		if cell not in self:
+			if default is PathStore._missing:
+				raise KeyError(cell)
+			return default
+		color = self[cell]
+		del self[cell]
+		return color
+
+	def popitem(self):
+		if not self:
+			raise KeyError("popitem(): path is empty")
+		cell = next(reversed(self.keys()))
+		color = self[cell]
+		del self[cell]
+		return cell, color
+
+	def clear(self):
+		super().clear()
+		self.row_buckets.clear()
+		self.mask[:] = False
+
+	def cells_in(self, top, left, bottom, right):
+		"""
+		Yields ((row, col), color) for the cells with top <= row <= bottom and left <= col <= right.
+		Only the row buckets inside the range are visited.
+		"""
+		for row in range(max(top, 0), min(bottom, self.rows - 1) + 1):
+			bucket = self.row_buckets.get(row)
+			if not bucket:
+				continue
+			for col, color in bucket.items():
+				if left <= col <= right:
+					yield (row, col), color
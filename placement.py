@@ -0,0 +1,101 @@
+import numpy as np
+from maze_grid import as_maze_grid
+from maze_solver import distance_field
+
+# Ways to place start and goal, for place(): "furthest" is the classic placement (the first free cell
+# and the cell furthest from it), "diameter" the two ends of the diameter and the fractions a route
+# of that share of the diameter.
+PLACEMENTS = {"furthest": None, "diameter": 1.0, "3/4": 0.75, "1/2": 0.5, "1/4": 0.25}
+
+
+def first_free_cell(grid):
+	# The first free (row, col) in row-major order, or None for a maze without free cells.
+	free = np.flatnonzero(grid.array.ravel() != 0)
+	return divmod(int(free[0]), grid.width) if free.size else None
+
+
+class PlacementIndex:
+	def __init__(self, grid, cell=None):
+		"""
+		Distance index of a maze for placing start and goal, built with two breadth-first searches.
+		Double sweep: the cell furthest from cell (default: the first free cell) is one end of the
+		diameter, the cell furthest from that end the other. On a perfect (tree) maze the path between
+		them is the longest shortest path of the maze; with loops (round_walk) it is a close lower bound.
+		The distances from both ends give every cell a lower bound of its eccentricity (the distance to
+		the cell furthest from it), exact on trees.
+		- grid: A MazeGrid.
+		- cell: (row, col) to start the sweep from.
+		Attributes:
+		- from_cell: DistanceField of cell; for the first free cell that is the "furthest" placement's solve.
+		- ends: The two (row, col) ends of the diameter.
+		- diameter: Steps between them.
+		- eccentricity: (height, width) int32 array, -1 for walls and cells not connected to the ends.
+		"""
+		self.grid = grid = as_maze_grid(grid)
+		if cell is None:
+			cell = first_free_cell(grid)
+		self.from_cell = distance_field(grid, *cell)
+		if self.from_cell is None:
+			raise ValueError("Cell {} is not free".format(cell))
+		self.from_first = distance_field(grid, *self.from_cell.furthest)
+		self.from_second = distance_field(grid, *self.from_first.furthest)
+		self.ends = (self.from_first.source, self.from_second.source)
+		self.diameter = self.from_first.max_distance
+		self.eccentricity = np.maximum(self.from_first.dist, self.from_second.dist)
+		self._by_eccentricity = None
+
+	def diameter_path(self):
+		# The cells from one end of the diameter to the other.
+		return self.from_first.path_to(*self.ends[1])
+
+	def starts_for(self, length):
+		"""
+		Returns the flat indexes (row * width + col) of the cells from which some cell is exactly length
+		steps away. A breadth-first search reaches every distance up to the eccentricity of its source,
+		and the eccentricity is at least the index's lower bound, so every returned cell qualifies.
+		"""
+		if self._by_eccentricity is None:
+			flat = self.eccentricity.ravel()
+			order = np.argsort(flat, kind="stable")
+			self._by_eccentricity = (order, flat[order])
+		order, sorted_eccentricity = self._by_eccentricity
+		return order[np.searchsorted(sorted_eccentricity, length):]
+
+	def pick(self, length, seed=None):
+		"""
+		Picks a start and a goal exactly length steps apart (along the shortest route), at random among
+		all such pairs reachable from a qualifying start: one breadth-first search from a start drawn
+		from starts_for(length), then a goal drawn from the cells at that distance. O(cells) in all.
+		Lengths are clamped to 1 .. diameter.
+		- seed: Seed for numpy.random.default_rng; the same seed always gives the same pair.
+		Returns (start, goal, from_start) with from_start the DistanceField of the start.
+		"""
+		rng = np.random.default_rng(seed)
+		length = min(max(1, int(length)), self.diameter)
+		starts = self.starts_for(length)
+		start = divmod(int(starts[rng.integers(starts.size)]), self.grid.width)
+		from_start = distance_field(self.grid, *start)
+		goals = np.flatnonzero(from_start.dist.ravel() == length)
+		goal = divmod(int(goals[rng.integers(goals.size)]), self.grid.width)
+		return start, goal, from_start
+
+
+def place(grid, placement, seed=None, index=None):
+	"""
+	Places start and goal in grid according to placement, a key of PLACEMENTS.
+	- seed: Seed of the random choice for the fractions of the diameter.
+	- index: The PlacementIndex of grid, if already built; placements other than "furthest" need one and
+	  build it otherwise, "furthest" reuses its first sweep.
+	Returns (start, goal, from_start, to_goal) with the DistanceFields of the start and of the goal.
+	"""
+	if placement not in PLACEMENTS:
+		raise ValueError("Unknown placement: {}".format(placement))
+	if placement == "furthest":
+		from_start = index.from_cell if index is not None else distance_field(grid, *first_free_cell(as_maze_grid(grid)))
+		return from_start.source, from_start.furthest, from_start, distance_field(grid, *from_start.furthest)
+	if index is None:
+		index = PlacementIndex(grid)
+	if placement == "diameter":
+		return index.ends[0], index.ends[1], index.from_first, index.from_second
+	start, goal, from_start = index.pick(round(PLACEMENTS[placement] * index.diameter), seed)
+	return start, goal, from_start, distance_field(grid, *goal)
@@ -1,5 +1,9 @@
+import copy
 import math
 import pygame
+from maze_grid import as_maze_grid
+
+
 def circle_rect_collision(circle_pos, radius, rect):
 	"""
 	Checks for collision between a circle (with center circle_pos and radius) and a rectangle.
@@ -17,35 +21,42 @@ def circle_collides(pos, radius, grid, CELL_SIZE):
 	Checks if a circle with center pos and radius collides with any black cell (obstacle) in the grid.
 	It limits the check to grid cells that are within the circle's bounding box.
 	"""
-	n = len(grid)
+	grid = as_maze_grid(grid)
+	is_free = grid.is_free
 	left_idx = max(0, int((pos.x - radius) // CELL_SIZE))
-	right_idx = min(n - 1, int((pos.x + radius) // CELL_SIZE))
+	right_idx = min(grid.width - 1, int((pos.x + radius) // CELL_SIZE))
 	top_idx = max(0, int((pos.y - radius) // CELL_SIZE))
-	bottom_idx = min(n - 1, int((pos.y + radius) // CELL_SIZE))
+	bottom_idx = min(grid.height - 1, int((pos.y + radius) // CELL_SIZE))
 
 	for row in range(top_idx, bottom_idx + 1):
 		for col in range(left_idx, right_idx + 1):
-			if not grid[row][col]:  # True represents a black cell (obstacle)
+			if not is_free(row, col):  # a black cell (obstacle)
 				rect = pygame.Rect(col * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
 				if circle_rect_collision(pos, radius, rect):
 					return True
 	return False
 
 class Player:
-	def __init__(self, pos, radius, speed, color=(255, 0, 0)):
+	def __init__(self, pos, radius, speed, color=(255, 0, 0), collision_map=None):
 		"""
 		Initializes the player.
 		- pos: A pygame.math.Vector2 for the player's position.
 		- radius: The radius of the player's circle.
 		- speed: The movement speed in pixels per second.
 		- color: The player's color.
+		- collision_map: Optional collision.CollisionMap of the maze; when set, moves slide along
+		  walls in one swept step instead of the two axis tests against the grid.
 		"""
 		self.pos = pos
 		self.orientation = 0
+		# Pose at the start of the current simulation tick, for interpolated rendering.
+		self.prev_pos = pos.copy()
+		self.prev_orientation = 0
 		self.fov = 90
 		self.radius = radius
 		self.speed = speed
 		self.color = color
+		self.collision_map = collision_map
 
 	def normalize_orientation(self):
 		while self.orientation > math.pi:
@@ -53,6 +64,39 @@ class Player:
 		while self.orientation < -math.pi:
 			self.orientation += 2 * math.pi
 
+	def begin_tick(self):
+		# Remembers the current pose as the one to interpolate from until the next tick.
+		self.prev_pos.update(self.pos)
+		self.prev_orientation = self.orientation
+
+	def rotate(self, angle):
+		"""
+		Turns the player by angle radians right away, outside the tick interpolation (used for mouse look,
+		which should never lag behind the hand).
+		"""
+		self.orientation += angle
+		self.prev_orientation += angle
+		self.normalize_orientation()
+
+	def _turn_since_tick(self):
+		turn = self.orientation - self.prev_orientation
+		while turn > math.pi:
+			turn -= 2 * math.pi
+		while turn < -math.pi:
+			turn += 2 * math.pi
+		return turn
+
+	def interpolated(self, alpha):
+		"""
+		Returns a copy of the player posed alpha (0..1) of the way from the last tick's pose to the current one,
+		for drawing between simulation ticks.
+		"""
+		view = copy.copy(self)
+		view.pos = self.prev_pos.lerp(self.pos, alpha)
+		view.orientation = self.prev_orientation + self._turn_since_tick() * alpha
+		view.normalize_orientation()
+		return view
+
 	def move(self, movement, grid, CELL_SIZE, dt):
 		"""
 		Attempts to move the player using separate axis collision checking.
@@ -63,6 +107,9 @@ class Player:
 
 		if movement.length() != 0:
 			movement = movement.normalize() * self.speed * dt
+		if self.collision_map is not None:
+			self.pos.x, self.pos.y = self.collision_map.slide(self.pos.x, self.pos.y, movement.x, movement.y)
+			return
 		# Move in x direction
 		new_pos = self.pos.copy()
 		new_pos.x += movement.x
@@ -99,6 +146,9 @@ class Player:
 			rotated_movement = pygame.math.Vector2()
 
 
+		if self.collision_map is not None:
+			self.pos.x, self.pos.y = self.collision_map.slide(self.pos.x, self.pos.y, rotated_movement.x, rotated_movement.y)
+			return
 		# Move in x direction
 		new_pos = self.pos.copy()
 		new_pos.x += rotated_movement.x
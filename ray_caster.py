@@ -1,9 +1,21 @@
-from rays import cast_ray, cast_horizontal_ray
+from rays import cast_horizontal_ray
+from batch_rays import cast_rays, SIDE_X
+from floor_caster import draw_floor, get_path_bitmap
+from frame_buffer import get_frame_buffer
+from instrumentation import NULL_TIMER
+from wall_textures import cell_textures, get_wall_textures
 from typing import Dict, Tuple
 from player import Player
+from maze_grid import MazeGrid, as_maze_grid
 import math
+import numpy as np
 import pygame
 
+FLOOR_SEGMENTS = "segments"
+FLOOR_PIXELS = "pixels"
+WALLS_FLAT = "flat"
+WALLS_TEXTURED = "textured"
+
 
 def is_close_to_grid(coord, cell_size, delta):
 	# Calculate the distance from the coordinate to the previous grid line.
@@ -16,6 +28,12 @@ def is_vector_close_to_grid(point, cell_size, delta):
 	# Check for both x and y coordinates.
 	return is_close_to_grid(point.x, cell_size, delta) and is_close_to_grid(point.y, cell_size, delta)
 
+
+def are_close_to_grid(coords, cell_size, delta):
+	# Array version of is_close_to_grid.
+	remainder = np.mod(coords, cell_size)
+	return (remainder < delta) | ((cell_size - remainder) < delta)
+
 def normalize_angle(angle):
 	while angle > math.pi:
 		angle -= 2 * math.pi
@@ -24,23 +42,11 @@ def normalize_angle(angle):
 	return angle
 
 
-def draw_view(player, grid, cell_size, max_distance, screen, width, height, path:Dict[Tuple[int, int], Tuple[int, int, int]]=None, path_point_size = 10):
+def draw_floor_segments(frame_buffer, player, cell_size, max_distance, width, height, grid, path=None, path_point_size=10, timer=NULL_TIMER):
 	"""
-	Draws the 2D raycasted view for the player.
-
-	First, walls are drawn using vertical rays as before.
-	Then, the floor is drawn by iterating over horizontal screen rows (from the horizon down)
-	and, for each row, computing a horizontal floor ray from leftmost to rightmost points.
-
-	For a given floor row (y on screen):
-		- The distance from the player is computed via similar triangles:
-			row_distance = (cell_size * height) / (2 * (y - horizon))
-		- The leftmost world point is calculated from an angle of (player.orientation - fov/2),
-		  and the rightmost from (player.orientation + fov/2).
-		- The floor ray from left_point to right_point is subdivided using cast_horizontal_ray.
-		- Each segment is then mapped linearly to screen x coordinates.
+	Draws the floor row by row with horizontal rays (see draw_view) into frame_buffer.
+	The number of rays and segments is counted on timer as floor_rays and floor_segments.
 	"""
-	# --- FLOOR DRAWING (horizontal rays) ---
 	horizon = height // 2
 	# Left and right boundary angles (in radians) for the floor.
 	left_angle = player.orientation - (player.fov / 2) / 180 * math.pi
@@ -66,10 +72,12 @@ def draw_view(player, grid, cell_size, max_distance, screen, width, height, path
 			right_point.x, right_point.y,
 			cell_size,
 			grid,
-			path if path is not None else [],
+			path if path is not None else {},
 			1,
 			path_point_size
 		)
+		timer.count("floor_rays")
+		timer.count("floor_segments", len(floor_segments))
 
 		# The total horizontal vector and its length for mapping to screen space.
 		total_vector = right_point - left_point
@@ -102,49 +110,131 @@ def draw_view(player, grid, cell_size, max_distance, screen, width, height, path
 			screen_x0 = int(t_start * width)
 			screen_x1 = int(t_end * width)
 
-			pygame.draw.line(screen, seg_color, (screen_x0, y), (screen_x1, y))
+			frame_buffer.draw_row_span(y, screen_x0, screen_x1, seg_color)
 
 
-	# --- WALL DRAWING (vertical rays) ---
+def _column_rays(player, grid, cell_size, max_distance, width, height, first_column, stop_column, max_height):
+	# Casts the rays of screen columns first_column .. stop_column - 1; returns them with their wall heights (at most max_height).
+	if stop_column is None:
+		stop_column = width
+	# All column rays are cast together; see batch_rays.cast_rays.
 	angle_step = player.fov / width / 180 * math.pi
-	current_angle = player.orientation - (player.fov / 2) / 180 * math.pi
-
-	for i in range(width):
-		current_angle += angle_step
-		direction = pygame.math.Vector2(math.cos(current_angle), math.sin(current_angle))
-		# Cast ray from player to wall.
-		end_point = cast_ray(player.pos, direction, grid, cell_size, max_distance)
-		distance = (end_point - player.pos).length()
-		if distance > max_distance - 0.001:
-			continue
-		# Correct distance to avoid fisheye distortion.
-		corrected_distance = abs(distance * math.cos(current_angle - player.orientation))
-		if corrected_distance > 0:
-			wall_height = min(height, int(height * cell_size / 2 / (corrected_distance + 0.0001)))
+	first_angle = player.orientation - (player.fov / 2) / 180 * math.pi
+	angles = first_angle + np.arange(first_column + 1, stop_column + 1) * angle_step
+	distances, sides, hit_rows, hit_cols = cast_rays(player.pos.x, player.pos.y, angles, grid, cell_size, max_distance)
+
+	# Correct distance to avoid fisheye distortion.
+	corrected = np.abs(distances * np.cos(angles - player.orientation))
+	with np.errstate(divide='ignore'):
+		wall_heights = np.where(corrected > 0, height * cell_size / 2 / (corrected + 0.0001), max_height)
+	wall_heights = np.minimum(max_height, wall_heights).astype(np.int64)
+	return angles, distances, sides, hit_rows, hit_cols, wall_heights
+
+
+def wall_spans(player, grid, cell_size, max_distance, width, height, first_column=0, stop_column=None):
+	"""
+	Casts the wall rays of screen columns first_column .. stop_column - 1 (all columns by default) and
+	returns the wall spans to draw as (columns, tops, bottoms, colors), ready for FrameBuffer.draw_column_spans.
+	Columns whose ray hits nothing within max_distance are left out.
+	"""
+	angles, distances, sides, hit_rows, hit_cols, wall_heights = _column_rays(player, grid, cell_size, max_distance,
+		width, height, first_column, stop_column, height)
+	# Determine wall color based on grid proximity of the hit point.
+	end_x = player.pos.x + np.cos(angles) * distances
+	end_y = player.pos.y + np.sin(angles) * distances
+	near_corner = are_close_to_grid(end_x, cell_size, 0.5) & are_close_to_grid(end_y, cell_size, 0.5)
+	visible = np.flatnonzero(distances <= max_distance - 0.001)
+	colors = np.where(near_corner[visible, None], np.uint8(128), np.uint8(0)).repeat(3, axis=1)
+	half_heights = wall_heights[visible] // 2
+	return visible + first_column, height // 2 - half_heights, height // 2 + half_heights, colors
+
+
+def wall_hits(player, grid, cell_size, max_distance, width, height, first_column=0, stop_column=None):
+	"""
+	Same rays as wall_spans, for textured walls (see wall_textures.WallTextures.draw_spans).
+	Returns (columns, tops, bottoms, offsets, sides, textures): tops and bottoms are those of the whole
+	wall, which may reach beyond the screen when it is close (up to 64 screen heights), offsets where
+	along the face each ray hit it, from 0 to 1 left to right as seen from the player.
+	"""
+	angles, distances, sides, hit_rows, hit_cols, wall_heights = _column_rays(player, grid, cell_size, max_distance,
+		width, height, first_column, stop_column, 64 * height)
+	visible = np.flatnonzero(distances <= max_distance - 0.001)
+	angles = angles[visible]
+	distances = distances[visible]
+	sides = sides[visible]
+	# A face on a vertical grid line runs along y, one on a horizontal grid line along x; faces seen
+	# looking left or down are mirrored so textures never show back to front.
+	along_y = sides == SIDE_X
+	hit = np.where(along_y, player.pos.y + np.sin(angles) * distances, player.pos.x + np.cos(angles) * distances)
+	offsets = np.mod(hit, cell_size) / cell_size
+	mirrored = np.where(along_y, np.cos(angles) < 0, np.sin(angles) > 0)
+	offsets = np.where(mirrored, 1 - offsets, offsets) % 1.0
+	half_heights = wall_heights[visible] // 2
+	return (visible + first_column, height // 2 - half_heights, height // 2 + half_heights, offsets, sides,
+		cell_textures(hit_rows[visible], hit_cols[visible]))
+
+
+def draw_view(player, grid, cell_size, max_distance, screen, width, height, path:Dict[Tuple[int, int], Tuple[int, int, int]]=None, path_point_size = 10, frame_buffer=None, floor_mode=FLOOR_SEGMENTS, timer=None, wall_mode=WALLS_FLAT):
+	"""
+	Draws the 2D raycasted view for the player.
+
+	First, walls are drawn using vertical rays as before.
+	Then, the floor is drawn. With floor_mode FLOOR_SEGMENTS it iterates over horizontal screen rows
+	(from the horizon down) and, for each row, computes a horizontal floor ray from leftmost to rightmost points.
+	With FLOOR_PIXELS every floor pixel is computed at once by floor_caster.draw_floor, so the cost
+	does not depend on the length of path.
+
+	For a given floor row (y on screen):
+		- The distance from the player is computed via similar triangles:
+			row_distance = (cell_size * height) / (2 * (y - horizon))
+		- The leftmost world point is calculated from an angle of (player.orientation - fov/2),
+		  and the rightmost from (player.orientation + fov/2).
+		- The floor ray from left_point to right_point is subdivided using cast_horizontal_ray.
+		- Each segment is then mapped linearly to screen x coordinates.
+
+	With wall_mode WALLS_FLAT walls are black, grey near cell corners; with WALLS_TEXTURED they are
+	sampled from the prefiltered textures of wall_textures.
+
+	Everything is written into a FrameBuffer (a shared one of the right size if none is given)
+	which is then drawn onto the screen with a single blit.
+	If an instrumentation.StageTimer is given, the floor, wall and present stages are timed with it
+	and the rays cast are counted on it.
+	"""
+	if timer is None:
+		timer = NULL_TIMER
+	if frame_buffer is None:
+		frame_buffer = get_frame_buffer(width, height)
+	frame_buffer.clear((255, 255, 255))
+
+	# --- FLOOR DRAWING ---
+	with timer.stage("floor"):
+		if floor_mode == FLOOR_PIXELS:
+			maze = as_maze_grid(grid)
+			path_bitmap = get_path_bitmap(path, maze.height, maze.width) if path is not None else None
+			draw_floor(frame_buffer, player, cell_size, max_distance, width, height, path_bitmap, path_point_size)
 		else:
-			wall_height = height
-		# Determine wall color based on grid proximity.
-		if not is_vector_close_to_grid(end_point, cell_size, 0.5):
-			color = (0, 0, 0)
+			draw_floor_segments(frame_buffer, player, cell_size, max_distance, width, height, grid, path, path_point_size, timer)
+
+	# --- WALL DRAWING (vertical rays) ---
+	with timer.stage("walls"):
+		if wall_mode == WALLS_TEXTURED:
+			get_wall_textures().draw_spans(frame_buffer, *wall_hits(player, grid, cell_size, max_distance, width, height))
 		else:
-			color = (128, 128, 128)
-		pygame.draw.line(screen, color, (i, height // 2 - wall_height // 2), (i, height // 2 + wall_height // 2))
+			columns, tops, bottoms, colors = wall_spans(player, grid, cell_size, max_distance, width, height)
+			frame_buffer.draw_column_spans(columns, tops, bottoms, colors)
+		timer.count("wall_rays", width)
 
+	with timer.stage("present"):
+		frame_buffer.present(screen)
 
 
 if __name__ == "__main__":
 	pygame.init()
 	screen = pygame.display.set_mode((600, 600))
 	player = Player(pygame.math.Vector2(200, 200), 10, 200)
-	grid = []
-	for i in range(10):
-		grid.append([True] * 10)
-	grid[0] = [False] * 10
-	grid[-1] = [False] * 10
-	for i in range(10):
-		grid[i][0] = False
-		grid[i][-1] = False
-		print(grid[i])
+	grid = MazeGrid(10, 10)
+	grid.array[1:-1, 1:-1] = 1
+	print(grid.array)
 
 	while True:
 		player.orientation += 0.01
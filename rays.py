@@ -1,6 +1,8 @@
 import math
 from typing import Dict, Tuple
 import pygame
+from maze_grid import as_maze_grid
+
 
 def cast_ray(start, direction, grid, CELL_SIZE, max_distance):
 	"""
@@ -8,7 +10,7 @@ def cast_ray(start, direction, grid, CELL_SIZE, max_distance):
 	Uses the DDA (Digital Differential Analyzer) algorithm for grid traversal.
 	- start: pygame.math.Vector2, starting position.
 	- direction: pygame.math.Vector2, normalized direction vector.
-	- grid: 2D list representing the maze grid.
+	- grid: The maze grid (a MazeGrid or a 2D list).
 	- CELL_SIZE: Size of each cell.
 	- max_distance: Maximum distance the ray can travel.
 	Returns the endpoint of the ray.
@@ -18,6 +20,10 @@ def cast_ray(start, direction, grid, CELL_SIZE, max_distance):
 		return start
 	direction = direction.normalize()
 
+	grid = as_maze_grid(grid)
+	width, height = grid.width, grid.height
+	is_free = grid.is_free
+
 	cell_x = int(start.x // CELL_SIZE)
 	cell_y = int(start.y // CELL_SIZE)
 
@@ -52,10 +58,10 @@ def cast_ray(start, direction, grid, CELL_SIZE, max_distance):
 	# Traverse the grid
 	while t < max_distance:
 		# Check if we are out of bounds
-		if cell_x < 0 or cell_x >= len(grid[0]) or cell_y < 0 or cell_y >= len(grid):
+		if cell_x < 0 or cell_x >= width or cell_y < 0 or cell_y >= height:
 			break
 		# If not the starting cell and the current cell is an obstacle, stop
-		if t > 0 and not grid[cell_y][cell_x]:
+		if t > 0 and not is_free(cell_y, cell_x):
 			break
 		# Step to next cell
 		if tMaxX < tMaxY:
@@ -74,6 +80,48 @@ def cast_ray(start, direction, grid, CELL_SIZE, max_distance):
 import math
 
 
+def cells_on_segment(start_x, start_y, end_x, end_y, cell_size):
+	"""
+	Returns the (row, column) of every cell crossed by the segment from (start_x, start_y) to (end_x, end_y),
+	in order, by walking the grid with the same DDA stepping as cast_ray.
+	"""
+	cell_x = int(start_x // cell_size)
+	cell_y = int(start_y // cell_size)
+	last_x = int(end_x // cell_size)
+	last_y = int(end_y // cell_size)
+	dx = end_x - start_x
+	dy = end_y - start_y
+	step_x = 1 if dx > 0 else -1
+	step_y = 1 if dy > 0 else -1
+	# Parameter t runs from 0 to 1 along the segment.
+	if dx != 0:
+		next_boundary_x = (cell_x + 1) * cell_size if dx > 0 else cell_x * cell_size
+		tMaxX = (next_boundary_x - start_x) / dx
+		tDeltaX = cell_size / abs(dx)
+	else:
+		tMaxX = float('inf')
+		tDeltaX = float('inf')
+	if dy != 0:
+		next_boundary_y = (cell_y + 1) * cell_size if dy > 0 else cell_y * cell_size
+		tMaxY = (next_boundary_y - start_y) / dy
+		tDeltaY = cell_size / abs(dy)
+	else:
+		tMaxY = float('inf')
+		tDeltaY = float('inf')
+
+	cells = [(cell_y, cell_x)]
+	steps = abs(last_x - cell_x) + abs(last_y - cell_y)
+	for _ in range(steps):
+		if tMaxX < tMaxY:
+			cell_x += step_x
+			tMaxX += tDeltaX
+		else:
+			cell_y += step_y
+			tMaxY += tDeltaY
+		cells.append((cell_y, cell_x))
+	return cells
+
+
 def cast_horizontal_ray(start_x, start_y, end_x, end_y, cell_size, grid, path:Dict[Tuple[int, int], Tuple[int, int, int]], delta, path_delta=0):
 	"""
 	Casts a horizontal ray on the floor from (start_x, start_y) to (end_x, end_y).
@@ -91,7 +139,7 @@ def cast_horizontal_ray(start_x, start_y, end_x, end_y, cell_size, grid, path:Di
 		end_x, end_y: Ending coordinates.
 		cell_size: The size of each cell.
 		grid: 2D grid (not used for geometry, but kept for consistency).
-		path: List of [cell_x, cell_y] indicating cells that, if hit near center, make the segment red.
+		path: Dict of (row, col) -> color for cells that, if hit near center, make the segment that color.
 		delta: The threshold distance for grid boundaries or cell centers.
 	"""
 	segments = []
@@ -133,9 +181,12 @@ def cast_horizontal_ray(start_x, start_y, end_x, end_y, cell_size, grid, path:Di
 			if 0.0 <= t_val <= 1.0:
 				t_breaks.add(t_val)
 
-	# For red segments: for each cell in path, compute intersection of the ray with the circle
-	# centered at the cell's center (with radius delta).
-	for cell in path.keys():
+	# For red segments: for each path cell the ray crosses, compute intersection of the ray with the circle
+	# centered at the cell's center (with radius delta). Path dots lie inside their cell, so cells the
+	# ray does not cross cannot contribute.
+	for cell in cells_on_segment(start_x, start_y, end_x, end_y, cell_size):
+		if cell not in path:
+			continue
 		cell_y, cell_x = cell
 		center_x = cell_x * cell_size + cell_size / 2.0
 		center_y = cell_y * cell_size + cell_size / 2.0
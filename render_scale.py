@@ -0,0 +1,88 @@
+from collections import deque
+import pygame
+
+# Internal render resolutions, as fractions of the window size, from sharpest to cheapest.
+RENDER_SCALES = (1.0, 0.75, 0.5, 0.25)
+RENDER_AUTO = "auto"
+
+
+def scale_label(scale):
+	if scale == RENDER_AUTO:
+		return RENDER_AUTO
+	return {1.0: "1", 0.75: "3/4", 0.5: "1/2", 0.25: "1/4"}.get(scale, "{:g}".format(scale))
+
+
+_surfaces = {}
+
+
+def _surface(width, height, like):
+	# Off-screen surface of the given size, reused from frame to frame.
+	surface = _surfaces.get((width, height))
+	if surface is None or surface.get_bitsize() != like.get_bitsize():
+		surface = pygame.Surface((width, height), 0, like)
+		_surfaces[(width, height)] = surface
+	return surface
+
+
+def draw_scaled_view(render_view, scale, player, grid, cell_size, max_distance, screen, width, height, *args, smooth=False, **kwargs):
+	"""
+	Draws the 3D view at an internal resolution of scale * (width, height) and upscales it onto screen.
+	Fewer columns mean fewer wall rays and fewer floor pixels, so the cost drops with the square of scale
+	while the world (cell_size, max_distance, player position) stays the same.
+	- render_view: ray_caster.draw_view or ParallelRenderer.draw_view; extra arguments are passed on to it.
+	- scale: Fraction of the full resolution, e.g. 0.5.
+	- smooth: Upscale with pygame.transform.smoothscale (blurrier, no blocky pixels) instead of scale.
+	"""
+	if scale >= 1:
+		render_view(player, grid, cell_size, max_distance, screen, width, height, *args, **kwargs)
+		return
+	small_width = max(1, int(width * scale))
+	small_height = max(1, int(height * scale))
+	small = _surface(small_width, small_height, screen)
+	render_view(player, grid, cell_size, max_distance, small, small_width, small_height, *args, **kwargs)
+	upscale = pygame.transform.smoothscale if smooth and small.get_bitsize() >= 24 else pygame.transform.scale
+	if screen.get_size() == (width, height):
+		upscale(small, (width, height), screen)
+	else:
+		screen.blit(upscale(small, (width, height)), (0, 0))
+
+
+class ResolutionScaler:
+	def __init__(self, budget_ms=1000 / 60, scales=RENDER_SCALES, window=30):
+		"""
+		Picks the internal render resolution from measured frame times.
+		When the average of the last window frames goes over budget_ms the resolution drops one step.
+		It goes back up one step only if the frame time predicted for the sharper scale (the current one
+		grown by the ratio of pixel counts) stays under 80 % of the budget, and after every change the
+		window is refilled before the next decision, so the scale does not flip-flop.
+		- budget_ms: Target work time per frame (not counting the time spent waiting for the frame cap).
+		- scales: Allowed scales, sharpest first.
+		"""
+		self.budget_ms = budget_ms
+		self.scales = scales
+		self.index = 0
+		self._times = deque(maxlen=window)
+
+	@property
+	def scale(self):
+		return self.scales[self.index]
+
+	def reset(self):
+		self.index = 0
+		self._times.clear()
+
+	def update(self, frame_seconds):
+		"""
+		Adds the work time of one frame; returns the scale to render the next frame at.
+		"""
+		self._times.append(frame_seconds * 1000)
+		if len(self._times) < self._times.maxlen:
+			return self.scale
+		average = sum(self._times) / len(self._times)
+		if average > self.budget_ms and self.index < len(self.scales) - 1:
+			self.index += 1
+			self._times.clear()
+		elif self.index > 0 and average * (self.scales[self.index - 1] / self.scale) ** 2 < self.budget_ms * 0.8:
+			self.index -= 1
+			self._times.clear()
+		return self.scale
@@ -0,0 +1,169 @@
+"""
+Replays recorded games (see session_file) through the game's own simulation, headless and as fast as
+possible, and checks that every replay ends exactly as the recorded game did: same number of ticks,
+goal reached or not, final player pose and the same path_taken cells.
+
+With --render the replay also draws the game's frames (one per FPS-th of a second of simulated time, as
+the live game at its frame cap) and reports per-stage frame times as JSON percentiles, like benchmark.py,
+so the sessions that triggered a complaint double as performance regression runs.
+
+Games are recorded by main.py into ~/.cache/memory_maze/replays (the newest KEEP_SESSIONS are kept).
+
+Usage: python replay.py session.replay [more.replay ...] [--render] [--render-scale 0.5] [--parallel] [--wall-mode flat]
+	[--output results.json] [--budget-ms 16.7]
+
+The exit status is 1 when a replay does not match its recording, or with --budget-ms when the 90th
+percentile frame time of a rendered replay is over budget.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+# Keep stdout clean for the JSON report.
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import json
+import sys
+import time
+import pygame
+import main as game
+from instrumentation import StageTimer, NULL_TIMER
+from session_file import ReplayKeys, path_digest, read_session
+
+# Largest difference in pixels (and radians) between the recorded and the replayed final pose.
+POSE_TOLERANCE = 1e-6
+
+
+def load_game(header):
+	"""
+	Sets up main's configuration from a session header and starts its game.
+	Returns the state returned by main.start_simulation.
+	"""
+	game.WINDOW_SIZE = header.window_size
+	game.ROUND_WALK = header.round_walk
+	game.THREE_D = header.three_d
+	game.config_view_distance = header.view_distance
+	game.config_floor_mode = header.floor_mode
+	game.config_maze_algorithm = header.algorithm
+	game.config_placement = header.placement
+	maze = game.prepare_maze(header.grid_size, header.algorithm, header.seed, header.placement)
+	return game.start_simulation(header.grid_size, maze)
+
+
+def mouse_look(player, turns):
+	# Mouse look is applied outside the ticks, one MOUSE_TURN at a time, as the event loop does.
+	for _ in range(abs(turns)):
+		player.rotate(game.MOUSE_TURN if turns > 0 else -game.MOUSE_TURN)
+
+
+def draw_frame(screen, font, grid, player, furthest, start, path, path_taken, elapsed_time, render_scale, timer):
+	# A frame of the running game, drawn as main.main draws it (without the dirty-rect path of the 2D view).
+	view_distance = game.config_view_distance * game.CELL_SIZE
+	if game.THREE_D:
+		screen.fill((255, 255, 255))
+		game.draw_scaled_view(game.renderer_3d(), render_scale, player, grid, game.CELL_SIZE, view_distance, screen,
+			game.WINDOW_SIZE, game.WINDOW_SIZE, path_taken, game.PATH_SIZE, floor_mode=game.config_floor_mode, timer=timer,
+			wall_mode=game.config_wall_mode)
+	else:
+		screen.fill((0, 0, 0))
+		game.draw_grid(grid, screen, furthest, start)
+		visible_area = pygame.Rect(player.pos.x - view_distance, player.pos.y - view_distance, 2 * view_distance, 2 * view_distance)
+		game.draw_path(path_taken, screen, (128, 0, 0), visible_area)
+		with timer.stage("visibility"):
+			timer.count("visibility_rays", game.visibility_overlay.draw(player, grid, game.CELL_SIZE, view_distance, screen))
+	with timer.stage("hud"):
+		game.draw_hud(screen, font, elapsed_time, path, path_taken)
+	if not game.THREE_D:
+		player.draw(screen)
+	with timer.stage("flip"):
+		pygame.display.flip()
+
+
+def replay(file_path, render=False, render_scale=1.0, font=None):
+	"""
+	Replays one session file. Returns a report: the recorded and the replayed outcome, the list of
+	mismatches (empty when the replay matches), the simulation time and, with render, the frame stages.
+	- font: Font of the HUD (needed with render).
+	"""
+	header, inputs, last_turns = read_session(file_path)
+	grid, player, furthest, player_start_cell, path, path_taken, _ = load_game(header)
+	screen = pygame.display.set_mode((header.window_size, header.window_size)) if render else None
+	timer = StageTimer() if render else NULL_TIMER
+	ticks_per_frame = max(1, round(header.tick_rate / game.FPS))
+	step = 1.0 / header.tick_rate
+
+	start = time.perf_counter()
+	player.begin_tick()
+	reached_goal = False
+	ticks = 0
+	for mask, turns in inputs:
+		mouse_look(player, turns)
+		ticks += 1
+		reached_goal = game.simulation_tick(player, grid, furthest, path_taken, ReplayKeys(mask), step)
+		if render and (ticks % ticks_per_frame == 0 or reached_goal):
+			with timer.stage("frame"):
+				draw_frame(screen, font, grid, player, furthest, player_start_cell, path, path_taken, ticks * step, render_scale, timer)
+		if reached_goal:
+			break
+	mouse_look(player, last_turns)
+	seconds = time.perf_counter() - start
+
+	expected = {"ticks": header.ticks, "reached_goal": header.reached_goal, "path_cells": header.path_cells,
+		"path_digest": header.path_digest, "final_pose": list(header.final_pose)}
+	replayed = {"ticks": ticks, "reached_goal": reached_goal, "path_cells": len(path_taken),
+		"path_digest": path_digest(path_taken), "final_pose": [player.pos.x, player.pos.y, player.orientation]}
+	mismatches = [name for name in ("ticks", "reached_goal", "path_cells", "path_digest") if expected[name] != replayed[name]]
+	if any(abs(a - b) > POSE_TOLERANCE for a, b in zip(expected["final_pose"], replayed["final_pose"])):
+		mismatches.append("final_pose")
+	report = {"session": file_path, "grid_size": header.grid_size, "seed": header.seed, "algorithm": header.algorithm,
+		"three_d": header.three_d, "expected": expected, "replayed": replayed, "mismatches": mismatches,
+		"replay_ms": seconds * 1000, "simulated_s": ticks * step}
+	if render:
+		report["render_scale"] = render_scale
+		report["stages"] = timer.summary()
+	return report
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Replay recorded games and check that they end as recorded.")
+	parser.add_argument("sessions", nargs="+", help="session files written by the game")
+	parser.add_argument("--render", action="store_true", help="also draw the frames and time them")
+	parser.add_argument("--render-scale", type=float, default=1.0, help="internal resolution of the 3D view, e.g. 0.5")
+	parser.add_argument("--parallel", action="store_true", help="render the 3D view with parallel_render")
+	parser.add_argument("--wall-mode", default=game.config_wall_mode, choices=game.WALL_MODES, help="walls of the rendered 3D view")
+	parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+	parser.add_argument("--budget-ms", type=float, help="with --render, fail if any replay's p90 frame time exceeds this")
+	args = parser.parse_args()
+
+	game.config_parallel_render = args.parallel
+	game.config_wall_mode = args.wall_mode
+	font = None
+	if args.render:
+		pygame.display.init()
+		pygame.font.init()
+		font = pygame.font.SysFont(None, 30)
+	reports = [replay(file_path, args.render, args.render_scale, font) for file_path in args.sessions]
+	pygame.quit()
+
+	text = json.dumps({"replays": reports}, indent=2)
+	if args.output:
+		with open(args.output, "w") as file:
+			file.write(text + "\n")
+	else:
+		print(text)
+
+	failed = False
+	for report in reports:
+		if report["mismatches"]:
+			sys.stderr.write("Replay differs from the recording: {}: {}\n".format(report["session"], ", ".join(report["mismatches"])))
+			failed = True
+		if args.budget_ms is not None and "frame" in report.get("stages", {}) and report["stages"]["frame"]["p90_ms"] > args.budget_ms:
+			sys.stderr.write("Over budget: {}: p90 {:.2f} ms\n".format(report["session"], report["stages"]["frame"]["p90_ms"]))
+			failed = True
+	if failed:
+		sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,61 @@
+class RouteTracker:
+	def __init__(self, from_start, to_goal):
+		"""
+		Live route-efficiency statistics for one run through a maze.
+		Both distance fields are computed once per maze (see maze_solver.distance_field); after that
+		every update is O(1), so the HUD can show the numbers every frame.
+		- from_start: DistanceField from the start cell.
+		- to_goal: DistanceField from the goal cell.
+		"""
+		self.from_start = from_start.dist
+		self.to_goal = to_goal.dist
+		self.start = from_start.source
+		self.goal = to_goal.source
+		self.optimal = int(self.to_goal[self.start])
+		self.reset()
+
+	def reset(self):
+		self.current = self.start
+		self.steps = 0
+		self.backtracks = 0
+		self.wasted_cells = 0
+		self._visited = {self.start}
+
+	def enter(self, cell):
+		"""
+		Records the player moving into cell, a (row, col) different from the current one.
+		"""
+		if cell == self.current:
+			return
+		self.steps += 1
+		if cell in self._visited:
+			self.backtracks += 1
+		else:
+			self._visited.add(cell)
+			if not self.on_route(cell):
+				self.wasted_cells += 1
+		self.current = cell
+
+	def on_route(self, cell):
+		# True if cell lies on a shortest route from start to goal.
+		return int(self.from_start[cell]) + int(self.to_goal[cell]) == self.optimal
+
+	@property
+	def extra_steps(self):
+		"""
+		Steps taken so far beyond the optimal route, assuming the player heads straight
+		to the goal from here: steps + distance to goal - optimal length.
+		"""
+		remaining = int(self.to_goal[self.current])
+		if remaining < 0:
+			return 0
+		return self.steps + remaining - self.optimal
+
+	@property
+	def off_route(self):
+		"""
+		Number of cells between the player and the optimal route. Exact on loop-free mazes;
+		with loops (round_walk) it is a lower bound.
+		"""
+		detour = int(self.from_start[self.current]) + int(self.to_goal[self.current]) - self.optimal
+		return max(detour, 0) // 2
@@ -0,0 +1,226 @@
+"""
+Compact recording of a played session, for replay.py.
+
+A session is everything needed to play a game again tick for tick: the maze (grid size, round walk,
+algorithm and seed, see main.prepare_maze), the settings that change the simulation or what is drawn
+(window size, tick rate, 3D mode, view distance, floor mode, start and goal placement) and the input of every simulation tick.
+The outcome of the game (ticks played, goal reached, final player pose and the cells of path_taken)
+is stored too, so a replay can check that it ends the same way.
+
+Layout (little endian):
+	- a 128 byte header (see HEADER).
+	- the input, run-length encoded: records of (key mask, mouse turns, repeat count) (see RUN), one
+	  per run of identical ticks. The key mask has a bit per KEY_BITS entry; mouse turns is the number
+	  of mouse look steps (main.MOUSE_TURN radians each, negative to the left) taken before the tick.
+	  A last record with a repeat count of 0 holds the mouse turns taken after the last tick.
+"""
+import os
+import struct
+import tempfile
+import time
+import zlib
+import pygame
+from maze_cache import default_cache_directory
+from maze_file import FILE_MODE
+
+MAGIC = b"MMRP"
+VERSION = 2
+HEADER = struct.Struct("<4sHHIiqIIfIIdddI16s8s8s")
+# Header layouts of the versions read_session still reads. Version 1 has no placement: its games
+# started and ended as placement "furthest" does.
+HEADERS = {1: struct.Struct("<4sHHIiqIIfIIdddI16s8s"), VERSION: HEADER}
+HEADER_SIZE = 128
+RUN = struct.Struct("<BhH")
+FLAG_THREE_D = 1
+FLAG_REACHED_GOAL = 2
+# Bit of the key mask -> keys that set it, as read by main.simulation_tick.
+KEY_BITS = (
+	(pygame.K_w, pygame.K_UP),
+	(pygame.K_s, pygame.K_DOWN),
+	(pygame.K_a, pygame.K_LEFT),
+	(pygame.K_d, pygame.K_RIGHT),
+	(pygame.K_q,),
+	(pygame.K_e,),
+)
+# Sessions kept in the replay directory; older ones are deleted when a new one is saved.
+KEEP_SESSIONS = 20
+
+
+def default_replay_directory():
+	return os.path.join(default_cache_directory(), "replays")
+
+
+def key_mask(keys):
+	"""
+	Packs the keys a simulation tick reads from a pygame.key.get_pressed() state into a KEY_BITS mask.
+	"""
+	mask = 0
+	for bit, bound in enumerate(KEY_BITS):
+		if any(keys[key] for key in bound):
+			mask |= 1 << bit
+	return mask
+
+
+class ReplayKeys:
+	def __init__(self, mask):
+		"""
+		Pressed-key state rebuilt from a key mask; indexed like pygame.key.get_pressed() (only the keys
+		of KEY_BITS can be pressed, each bit presses the first key bound to it).
+		"""
+		self._pressed = {bound[0] for bit, bound in enumerate(KEY_BITS) if mask >> bit & 1}
+
+	def __getitem__(self, key):
+		return key in self._pressed
+
+
+def path_digest(path_taken):
+	# Checksum of the cells of path_taken (a PathStore or dict keyed by (row, col)), independent of order.
+	data = b"".join(struct.pack("<II", row, col) for row, col in sorted(path_taken.keys()))
+	return zlib.crc32(data)
+
+
+class SessionHeader:
+	def __init__(self, grid_size, round_walk, seed, algorithm, window_size, tick_rate, three_d, view_distance,
+			floor_mode, placement="furthest", ticks=0, reached_goal=False, final_pose=(0.0, 0.0, 0.0), path_cells=0, path_digest=0):
+		self.grid_size = grid_size
+		self.round_walk = round_walk
+		self.seed = seed
+		self.algorithm = algorithm
+		self.window_size = window_size
+		self.tick_rate = tick_rate
+		self.three_d = three_d
+		self.view_distance = view_distance
+		self.floor_mode = floor_mode
+		self.placement = placement
+		# Outcome of the recorded game.
+		self.ticks = ticks
+		self.reached_goal = reached_goal
+		self.final_pose = final_pose
+		self.path_cells = path_cells
+		self.path_digest = path_digest
+
+	def pack(self):
+		flags = (FLAG_THREE_D if self.three_d else 0) | (FLAG_REACHED_GOAL if self.reached_goal else 0)
+		data = HEADER.pack(MAGIC, VERSION, flags, self.grid_size, self.round_walk, self.seed, self.window_size,
+			self.tick_rate, self.view_distance, self.ticks, self.path_cells, *self.final_pose, self.path_digest,
+			self.algorithm.encode("ascii")[:16], self.floor_mode.encode("ascii")[:8], self.placement.encode("ascii")[:8])
+		return data.ljust(HEADER_SIZE, b"\0")
+
+	@classmethod
+	def unpack(cls, data):
+		magic, version = struct.unpack_from("<4sH", data)
+		if magic != MAGIC:
+			raise ValueError("Not a session file")
+		if version not in HEADERS:
+			raise ValueError("Unsupported session file version {} (this build reads {})".format(
+				version, ", ".join(str(known) for known in sorted(HEADERS))))
+		fields = HEADERS[version].unpack_from(data)
+		if version == 1:
+			fields += (b"furthest",)
+		magic, version, flags, grid_size, round_walk, seed, window_size, tick_rate, view_distance, ticks, path_cells, \
+			x, y, orientation, digest, algorithm, floor_mode, placement = fields
+		return cls(grid_size, round_walk, seed, algorithm.rstrip(b"\0").decode("ascii"), window_size, tick_rate,
+			bool(flags & FLAG_THREE_D), view_distance, floor_mode.rstrip(b"\0").decode("ascii"),
+			placement.rstrip(b"\0").decode("ascii"), ticks,
+			bool(flags & FLAG_REACHED_GOAL), (x, y, orientation), path_cells, digest)
+
+
+class SessionRecorder:
+	def __init__(self, header):
+		"""
+		Records the input of a game tick by tick, in memory, as runs of identical ticks.
+		- header: SessionHeader with the maze and settings of the game; the outcome is filled in by finish().
+		"""
+		self.header = header
+		self.runs = []
+		self.turns = 0
+
+	def turn(self, steps):
+		# Records mouse look steps (negative to the left), applied by the game right away.
+		self.turns += steps
+
+	def tick(self, keys):
+		"""
+		Records one simulation tick, with the mouse turns since the previous one.
+		- keys: Pressed-key state the tick reads (pygame.key.get_pressed()).
+		"""
+		mask = key_mask(keys)
+		turns = self.turns
+		self.turns = 0
+		if self.runs and self.runs[-1][0] == mask and self.runs[-1][1] == turns and self.runs[-1][2] < 0xFFFF:
+			self.runs[-1][2] += 1
+		else:
+			self.runs.append([mask, turns, 1])
+		self.header.ticks += 1
+
+	def finish(self, reached_goal, player, path_taken):
+		"""
+		Stores the outcome of the game: whether the goal was reached, the player's pose and path_taken.
+		Returns the recorder.
+		"""
+		if self.turns:
+			self.runs.append([0, self.turns, 0])
+			self.turns = 0
+		self.header.reached_goal = reached_goal
+		self.header.final_pose = (player.pos.x, player.pos.y, player.orientation)
+		self.header.path_cells = len(path_taken)
+		self.header.path_digest = path_digest(path_taken)
+		return self
+
+	def pack(self):
+		return self.header.pack() + b"".join(RUN.pack(*run) for run in self.runs)
+
+
+def write_session(file_path, recorder):
+	"""
+	Writes a recorded session to file_path (to a temporary file of its own first, then renamed).
+	"""
+	descriptor, temporary = tempfile.mkstemp(suffix=".tmp", prefix=os.path.basename(file_path) + ".", dir=os.path.dirname(file_path) or ".")
+	try:
+		with os.fdopen(descriptor, "wb") as file:
+			file.write(recorder.pack())
+		os.chmod(temporary, FILE_MODE)
+		os.replace(temporary, file_path)
+	except BaseException:
+		os.remove(temporary)
+		raise
+
+
+def read_session(file_path):
+	"""
+	Reads a session file. Returns (header, inputs, last_turns): inputs is a list of (key mask, mouse turns),
+	one per tick, and last_turns the mouse turns taken after the last tick.
+	"""
+	with open(file_path, "rb") as file:
+		data = file.read()
+	header = SessionHeader.unpack(data)
+	inputs = []
+	last_turns = 0
+	for mask, turns, count in RUN.iter_unpack(data[HEADER_SIZE:]):
+		if count == 0:
+			last_turns += turns
+		inputs.extend([(mask, turns)] * count)
+	return header, inputs, last_turns
+
+
+def save_session(recorder, directory=None, name=None, keep=KEEP_SESSIONS):
+	"""
+	Saves a finished recording into directory (default: ~/.cache/memory_maze/replays) and deletes all but
+	the newest keep sessions there. Returns the file path.
+	- name: File name; by default session_<date>_<time>_<milliseconds>.replay.
+	"""
+	directory = default_replay_directory() if directory is None else directory
+	os.makedirs(directory, exist_ok=True)
+	if name is None:
+		now = time.time()
+		name = "session_{}_{:03d}.replay".format(time.strftime("%Y%m%d_%H%M%S", time.localtime(now)), int(now * 1000) % 1000)
+	file_path = os.path.join(directory, name)
+	write_session(file_path, recorder)
+	sessions = sorted((entry for entry in os.scandir(directory) if entry.name.endswith(".replay")),
+		key=lambda entry: entry.stat().st_mtime, reverse=True)
+	for entry in sessions[keep:]:
+		try:
+			os.remove(entry.path)
+		except OSError:
+			pass
+	return file_path
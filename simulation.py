@@ -0,0 +1,39 @@
+class FixedTimestep:
+	def __init__(self, tick_rate=120, max_ticks=8):
+		"""
+		Splits variable frame times into fixed simulation ticks (accumulator scheme).
+		Gameplay advances in steps of exactly 1 / tick_rate seconds however fast or slow frames are
+		rendered, so a slow frame means more ticks, never a longer step that could skip past walls.
+		- tick_rate: Simulation ticks per second.
+		- max_ticks: Most ticks run for one frame; time beyond that is dropped so a long stall
+		  (window drag, breakpoint) cannot make the simulation spiral behind.
+		"""
+		self.tick_rate = tick_rate
+		self.step = 1.0 / tick_rate
+		self.max_ticks = max_ticks
+		self.accumulator = 0.0
+
+	def reset(self):
+		self.accumulator = 0.0
+
+	def advance(self, frame_time):
+		"""
+		Adds frame_time seconds and returns the number of ticks to run now.
+		"""
+		self.accumulator += frame_time
+		ticks = int(self.accumulator / self.step)
+		if ticks > self.max_ticks:
+			ticks = self.max_ticks
+			self.accumulator = 0.0
+		else:
+			self.accumulator -= ticks * self.step
+		return ticks
+
+	@property
+	def alpha(self):
+		"""
+		How far (0..1) the current frame is between the last tick and the next one; used to
+		interpolate what is drawn between the last two simulated states.
+		"""
+		# Rounding in advance() can leave the accumulator a hair below zero.
+		return min(max(self.accumulator / self.step, 0.0), 1.0)
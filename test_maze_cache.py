@@ -0,0 +1,52 @@
+import unittest
+from maze_cache import CachedMaze, MazeCache
+from maze_generators import generate
+from maze_solver import distance_field
+from placement import first_free_cell, place
+
+
+def solved_maze(seed, size=21):
+	grid = generate(size, size, 0, "backtracker", seed)
+	from_start = distance_field(grid, *first_free_cell(grid))
+	return CachedMaze(grid, from_start.source, from_start.furthest, from_start.path_to(*from_start.furthest))
+
+
+class MazeCacheMemoryTest(unittest.TestCase):
+	def assert_counted(self, cache):
+		# The memory counted for the cache is the size of the mazes it holds, as they are now.
+		self.assertEqual(cache._bytes, sum(maze.size for maze, counted in cache._entries.values()))
+
+	def test_recount_counts_grown_maze(self):
+		cache = MazeCache(directory="")
+		key = (21, 21, 0, 1, "backtracker")
+		maze = solved_maze(1)
+		cache.put(key, maze, False)
+		self.assert_counted(cache)
+		size = maze.size
+		maze.routes["1/2"] = place(maze.grid, "1/2", 1)
+		cache.recount(key)
+		self.assertGreater(maze.size, size)
+		self.assert_counted(cache)
+		cache.recount(key)
+		self.assert_counted(cache)
+
+	def test_eviction_keeps_count(self):
+		maze = solved_maze(0)
+		cache = MazeCache(directory="", max_bytes=3 * maze.size)
+		for seed in range(6):
+			cache.put((21, 21, 0, seed, "backtracker"), solved_maze(seed), False)
+			self.assert_counted(cache)
+		self.assertLessEqual(cache._bytes, cache.max_bytes)
+
+	def test_recount_of_evicted_key_does_nothing(self):
+		cache = MazeCache(directory="", max_bytes=1)
+		first, second = (21, 21, 0, 1, "backtracker"), (21, 21, 0, 2, "backtracker")
+		cache.put(first, solved_maze(1), False)
+		cache.put(second, solved_maze(2), False)
+		cache.recount(first)
+		self.assertEqual(list(cache._entries), [second])
+		self.assert_counted(cache)
+
+
+if __name__ == "__main__":
+	unittest.main()
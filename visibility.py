@@ -0,0 +1,112 @@
+import math
+import numpy as np
+import pygame
+from batch_rays import cast_rays, grid_to_array
+
+# Angular offset (radians) of the two rays cast just past each visible corner.
+CORNER_EPSILON = 1e-5
+# Largest gap (pixels) allowed between the view circle and the chords that approximate it.
+ARC_TOLERANCE = 0.5
+# Colour key of the overlay: pixels of this colour are see-through.
+_HOLE = (255, 0, 255)
+
+
+def wall_corners(x, y, grid, cell_size, max_distance):
+	"""
+	Returns the grid points within max_distance of (x, y) where the outline of the walls bends, as two
+	pixel coordinate arrays (xs, ys). A grid point qualifies when the four cells around it are a mix of
+	walls and free cells other than a straight wall edge (two walls side by side); cells outside the maze
+	count as walls. Only these points can be vertices of the visibility polygon.
+	"""
+	cells = grid_to_array(grid)
+	height, width = cells.shape
+	reach = int(max_distance // cell_size) + 1
+	row = int(y // cell_size)
+	col = int(x // cell_size)
+	top, bottom = row - reach, row + reach + 1
+	left, right = col - reach, col + reach + 1
+	# Window of cells around the viewer plus a one cell margin, padded with walls outside the maze.
+	window = np.zeros((bottom - top + 2, right - left + 2), dtype=bool)
+	src_top, src_bottom = max(top - 1, 0), min(bottom + 1, height)
+	src_left, src_right = max(left - 1, 0), min(right + 1, width)
+	if src_top < src_bottom and src_left < src_right:
+		window[src_top - top + 1:src_bottom - top + 1, src_left - left + 1:src_right - left + 1] = \
+			cells[src_top:src_bottom, src_left:src_right] != 0
+	# The four cells around grid point (top + i, left + j): up-left, up-right, down-left, down-right.
+	up_left = window[:-1, :-1]
+	up_right = window[:-1, 1:]
+	down_left = window[1:, :-1]
+	down_right = window[1:, 1:]
+	free = up_left.astype(np.int8) + up_right + down_left + down_right
+	diagonal = (up_left == down_right) & (up_right == down_left) & (up_left != up_right)
+	corner = (free == 1) | (free == 3) | ((free == 2) & diagonal)
+	rows, cols = np.nonzero(corner)
+	xs = (cols + left).astype(np.float64) * cell_size
+	ys = (rows + top).astype(np.float64) * cell_size
+	near = (xs - x) ** 2 + (ys - y) ** 2 <= max_distance * max_distance
+	return xs[near], ys[near]
+
+
+def visibility_polygon(x, y, grid, cell_size, max_distance):
+	"""
+	Computes the area visible from (x, y) within max_distance, as a list of (x, y) polygon points in
+	angular order, by angular sweep: rays are cast only toward wall corners (see wall_corners), plus
+	two rays just past every corner that turns out to be visible, which slip by it to whatever lies
+	behind. Where no wall is in range the polygon follows the view circle, sampled just densely enough
+	to stay within ARC_TOLERANCE pixels of it.
+	Returns (points, ray_count).
+	"""
+	corner_x, corner_y = wall_corners(x, y, grid, cell_size, max_distance)
+	corner_angles = np.arctan2(corner_y - y, corner_x - x)
+	corner_distances = np.hypot(corner_x - x, corner_y - y)
+	distances, _, _, _ = cast_rays(x, y, corner_angles, grid, cell_size, max_distance)
+	# A corner is visible when its ray reaches it (hits the corner itself or slips past it).
+	visible = corner_angles[distances >= corner_distances - 1e-6 * cell_size]
+
+	if max_distance > ARC_TOLERANCE:
+		arc_step = 2 * math.acos(1 - ARC_TOLERANCE / max_distance)
+	else:
+		arc_step = math.pi / 2
+	arc_angles = np.linspace(-math.pi, math.pi, max(8, int(math.ceil(2 * math.pi / arc_step))), endpoint=False)
+	extra_angles = np.concatenate([visible - CORNER_EPSILON, visible + CORNER_EPSILON, arc_angles])
+	extra_distances, _, _, _ = cast_rays(x, y, extra_angles, grid, cell_size, max_distance)
+
+	angles = np.concatenate([corner_angles, extra_angles])
+	distances = np.concatenate([distances, extra_distances])
+	order = np.argsort(np.mod(angles, 2 * math.pi), kind="stable")
+	angles = angles[order]
+	distances = distances[order]
+	points = np.stack([x + np.cos(angles) * distances, y + np.sin(angles) * distances], axis=1)
+	return points.tolist(), angles.size
+
+
+class VisibilityOverlay:
+	def __init__(self):
+		"""
+		Darkens everything outside the visibility polygon (the 2D view's fog of war).
+		The overlay surface is kept between frames and only re-created when the screen size changes;
+		the polygon is cut out with a colour key, which blits faster than a per-pixel alpha surface.
+		"""
+		self.surface = None
+
+	def draw(self, player, grid, cell_size, max_distance, screen, areas=None):
+		"""
+		Same as rays.draw_polygon_from_rays, with the exact polygon of visibility_polygon.
+		- areas: Optional list of pygame.Rects; only these parts of the screen are darkened (for
+		  dirty-rect updates, they must cover the polygon of the previous frame as well as this one).
+		Returns the number of rays cast.
+		"""
+		points, ray_count = visibility_polygon(player.pos.x, player.pos.y, grid, cell_size, max_distance)
+		if self.surface is None or self.surface.get_size() != screen.get_size():
+			self.surface = pygame.Surface(screen.get_size())
+			self.surface.set_colorkey(_HOLE)
+			areas = None
+		if areas is None:
+			areas = [self.surface.get_rect()]
+		for area in areas:
+			self.surface.fill((0, 0, 0), area)
+		if len(points) >= 3:
+			pygame.draw.polygon(self.surface, _HOLE, points)
+		for area in areas:
+			screen.blit(self.surface, area.topleft, area)
+		return ray_count
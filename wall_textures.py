@@ -0,0 +1,178 @@
+"""
+Procedural wall textures for the 3D view.
+
+Every texture is generated once at TEXTURE_SIZE x TEXTURE_SIZE texels, together with its mip levels
+(each half the size of the previous one, box filtered) and a darker copy for the faces hit on a
+horizontal grid line, and everything is packed into one flat texel atlas. Texels are stored column by
+column, so a screen column of wall reads one contiguous texture column of one mip level.
+
+A screen column picks the mip level whose texture column is the first not taller than the wall span
+(its distance bucket), so walls are minified by the prefiltered levels instead of being scaled with
+pygame.transform every frame, and far walls read only a handful of texels. All columns of a frame
+are sampled with a single gather from the atlas (see WallTextures.draw_spans).
+
+The texture of a wall cell is picked by a hash of its (row, col): mostly brick, some stone, now and
+then a wooden or tiled wall that the player can remember as a landmark.
+"""
+import numpy as np
+from batch_rays import SIDE_Y
+
+TEXTURE_SIZE = 64
+LEVELS = TEXTURE_SIZE.bit_length()  # 64, 32, ..., 1 texels
+# Brightness of faces hit on a horizontal grid line (SIDE_Y), so corners stay readable.
+SIDE_Y_SHADE = 0.7
+# Texture of a wall cell, indexed by the low bits of its hash.
+CELL_TEXTURES = np.array([0] * 11 + [1] * 3 + [2, 3], dtype=np.int64)
+# Fraction bits of the fixed point texel rows in WallTextures.draw_spans.
+FIXED_SHIFT = 16
+# The textures' patterns are the same on every run.
+TEXTURE_SEED = 7
+
+
+def _coordinates():
+	# Texel coordinates (u across the wall, v down it), indexed [u, v] like pygame.surfarray.
+	texels = np.arange(TEXTURE_SIZE)
+	return texels[:, None], texels[None, :]
+
+
+def _finish(colors, rng, grain):
+	# Adds some per-texel noise and converts to uint8.
+	noise = rng.integers(-grain, grain + 1, colors.shape[:2] + (1,))
+	return np.clip(colors + noise, 0, 255).astype(np.uint8)
+
+
+def brick(rng):
+	u, v = _coordinates()
+	course = v // 16
+	mortar = (v % 16 < 2) | ((u + (course % 2) * 16) % 32 < 2)
+	colors = np.where(mortar[..., None], np.array([165, 160, 150]), np.array([150, 62, 45]))
+	# Every brick a slightly different shade.
+	brick_id = course * 2 + (u + (course % 2) * 16) // 32
+	shade = rng.integers(-18, 19, 8)[brick_id % 8]
+	colors = colors + np.where(mortar, 0, shade)[..., None]
+	return _finish(colors, rng, 10)
+
+
+def stone(rng):
+	u, v = _coordinates()
+	block = (v // 32) * 2 + ((u + (v // 32) * 16) % TEXTURE_SIZE) // 32
+	seams = (v % 32 < 2) | ((u + (v // 32) * 16) % 32 < 2)
+	gray = 120 + rng.integers(-15, 16, 4)[block]
+	colors = np.where(seams, 60, gray)[..., None] * np.ones(3)
+	return _finish(colors, rng, 16)
+
+
+def wood(rng):
+	u, v = _coordinates()
+	plank = u // 16
+	gaps = u % 16 < 1
+	grain = 12 * np.sin(v / 5 + plank * 1.7 + (u % 16) / 3)
+	colors = np.array([125, 85, 45]) + (grain + rng.integers(-10, 11, 4)[plank])[..., None]
+	colors = np.where(gaps[..., None], np.array([50, 30, 15]), colors)
+	return _finish(colors, rng, 6)
+
+
+def tile(rng):
+	u, v = _coordinates()
+	center = TEXTURE_SIZE // 2
+	diamond = np.abs(u - center) + np.abs(v - center) < 20
+	border = (np.minimum(u, v) < 3) | (np.maximum(u, v) > TEXTURE_SIZE - 4)
+	colors = np.where(diamond[..., None], np.array([230, 190, 40]), np.array([40, 70, 160]))
+	colors = np.where(border[..., None], np.array([230, 230, 230]), colors)
+	return _finish(colors, rng, 4)
+
+
+TEXTURES = (brick, stone, wood, tile)
+
+
+def mip_levels(texture):
+	"""
+	Returns the mip levels of a square texture whose size is a power of two: the texture itself, then
+	each level half the size of the previous one, every texel the mean of 2 x 2 texels, down to 1 x 1.
+	"""
+	levels = [texture]
+	while levels[-1].shape[0] > 1:
+		size = levels[-1].shape[0] // 2
+		levels.append(levels[-1].reshape(size, 2, size, 2, 3).mean(axis=(1, 3)).astype(np.uint8))
+	return levels
+
+
+def cell_textures(rows, cols):
+	# Index into TEXTURES of the wall cells (rows[i], cols[i]).
+	hashed = (np.asarray(rows, dtype=np.int64) * 73856093) ^ (np.asarray(cols, dtype=np.int64) * 19349663)
+	return CELL_TEXTURES[hashed & (len(CELL_TEXTURES) - 1)]
+
+
+def _pixel_items(pixels):
+	# A flat view of a contiguous (..., 3) uint8 array with one item per pixel.
+	return pixels.reshape(-1, 3).view("V3").reshape(-1)
+
+
+class WallTextures:
+	def __init__(self, seed=TEXTURE_SEED):
+		"""
+		The texel atlas of all TEXTURES: for every texture, face side (SIDE_X, SIDE_Y) and mip level one
+		block of texels stored column by column. offsets[texture, side, level] is the atlas index of the
+		first texel of a block; texel (u, v) of level l is at offsets[...] + u * (TEXTURE_SIZE >> l) + v.
+		"""
+		rng = np.random.default_rng(seed)
+		blocks = []
+		self.offsets = np.zeros((len(TEXTURES), 2, LEVELS), dtype=np.int64)
+		start = 0
+		for texture_index, make in enumerate(TEXTURES):
+			texture = make(rng)
+			for side, shade in enumerate((1.0, SIDE_Y_SHADE)):
+				for level, texels in enumerate(mip_levels((texture * shade).astype(np.uint8))):
+					self.offsets[texture_index, side, level] = start
+					blocks.append(texels.reshape(-1, 3))
+					start += blocks[-1].shape[0]
+		self.atlas = np.concatenate(blocks)
+		# The same texels as one 3 byte item each, so that sampling is a flat gather of whole pixels.
+		self._texels = _pixel_items(self.atlas)
+
+	def draw_spans(self, frame_buffer, columns, tops, bottoms, offsets, sides, textures):
+		"""
+		Draws textured wall spans into frame_buffer, one per column, clipped to the buffer.
+		- columns: int array of screen x coordinates.
+		- tops, bottoms: int arrays with the first and last screen row of each whole wall (may reach
+		  beyond the buffer when the wall is close).
+		- offsets: float array in [0, 1): where along the face the ray hit it (the texture's u).
+		- sides: SIDE_X / SIDE_Y of the face hit.
+		- textures: index into TEXTURES of each span (see cell_textures).
+		"""
+		if len(columns) == 0:
+			return
+		heights = bottoms - tops + 1
+		levels = np.clip(np.ceil(np.log2(TEXTURE_SIZE / heights)), 0, LEVELS - 1).astype(np.int64)
+		sizes = TEXTURE_SIZE >> levels
+		u = np.minimum((offsets * sizes).astype(np.int64), sizes - 1)
+		bases = self.offsets[textures, (sides == SIDE_Y).astype(np.int64), levels] + u * sizes
+
+		# One run of pixels per column, concatenated: run i covers rows first[i] .. last[i].
+		first = np.maximum(tops, 0)
+		last = np.minimum(bottoms, frame_buffer.height - 1)
+		lengths = np.maximum(last - first + 1, 0)
+		starts = np.cumsum(lengths) - lengths
+		steps = np.arange(lengths.sum())
+		# Texel row (row - top) * size / height in 16.16 fixed point: per run a start and a step
+		# (rounded down, so rows never run past the texture column), row - top counted from the run's start.
+		texel_steps = (sizes << FIXED_SHIFT) // heights
+		texels = steps * np.repeat(texel_steps, lengths)
+		texels += np.repeat((bases << FIXED_SHIFT) + (first - tops - starts) * texel_steps, lengths)
+		texels >>= FIXED_SHIFT
+		pixels = steps
+		pixels += np.repeat(columns * frame_buffer.height + first - starts, lengths)
+		np.put(_pixel_items(frame_buffer.pixels), pixels, np.take(self._texels, texels))
+
+
+_shared_textures = None
+
+
+def get_wall_textures():
+	"""
+	Returns the shared WallTextures, generating the textures on first use.
+	"""
+	global _shared_textures
+	if _shared_textures is None:
+		_shared_textures = WallTextures()
+	return _shared_textures